@@ -2,91 +2,327 @@
 """
 DICOM Info Gatherer - Python Version
 This script processes DICOM files without requiring MATLAB Image Processing Toolbox.
-Requires: pip install pydicom pandas
+Requires: pip install pydicom pandas numpy
 """
 
 import os
 import sys
 import re
+import io
 from pathlib import Path
-import pandas as pd
-from concurrent.futures import ThreadPoolExecutor
-import multiprocessing as mp
+import numpy as np
+# pandas is only needed to merge CSVs, so it is imported where used: worker processes
+# that run gather_info never have to load it
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 import subprocess
+import shutil
 import argparse
+import csv
+import json
+import queue
 import threading
+import traceback
+import itertools
+import time
+from collections import Counter, deque
+from contextlib import redirect_stdout
+from dataclasses import dataclass
 
-try:
-    import tkinter as tk
-    from tkinter import filedialog, messagebox, scrolledtext
-    GUI_AVAILABLE = True
-    # Try to import CustomTkinter for modern UI
-    # Allow disabling via environment variable to avoid segfaults
-    import os
-    FORCE_DISABLE_CTK = os.environ.get('DISABLE_CUSTOMTKINTER', '').lower() in ('1', 'true', 'yes')
-    
-    CUSTOM_TKINTER_AVAILABLE = False
-    if not FORCE_DISABLE_CTK:
-        try:
-            import customtkinter as ctk
-            # Test if CustomTkinter works by trying to set appearance mode
-            # This helps catch initialization issues early
+# GUI modules are imported lazily by _init_gui() so CLI runs don't pay for GUI startup
+GUI_AVAILABLE = False
+CUSTOM_TKINTER_AVAILABLE = False
+_GUI_INITIALIZED = False
+
+
+def _init_gui():
+    """Import tkinter (and CustomTkinter if possible). Returns True if a GUI is available"""
+    global GUI_AVAILABLE, CUSTOM_TKINTER_AVAILABLE, _GUI_INITIALIZED
+    global tk, filedialog, messagebox, scrolledtext, ttk, ctk
+    
+    if _GUI_INITIALIZED:
+        return GUI_AVAILABLE
+    _GUI_INITIALIZED = True
+    
+    try:
+        import tkinter as tk
+        from tkinter import filedialog, messagebox, scrolledtext
+        GUI_AVAILABLE = True
+        # Try to import CustomTkinter for modern UI
+        # Allow disabling via environment variable to avoid segfaults
+        FORCE_DISABLE_CTK = os.environ.get('DISABLE_CUSTOMTKINTER', '').lower() in ('1', 'true', 'yes')
+        
+        CUSTOM_TKINTER_AVAILABLE = False
+        if not FORCE_DISABLE_CTK:
             try:
-                ctk.set_appearance_mode("dark")
-                CUSTOM_TKINTER_AVAILABLE = True
-            except Exception:
-                # CustomTkinter imported but initialization failed
+                import customtkinter as ctk
+                # Test if CustomTkinter works by trying to set appearance mode
+                # This helps catch initialization issues early
+                try:
+                    ctk.set_appearance_mode("dark")
+                    CUSTOM_TKINTER_AVAILABLE = True
+                except Exception:
+                    # CustomTkinter imported but initialization failed
+                    CUSTOM_TKINTER_AVAILABLE = False
+                    import tkinter.ttk as ttk
+            except (ImportError, Exception):
                 CUSTOM_TKINTER_AVAILABLE = False
                 import tkinter.ttk as ttk
-        except (ImportError, Exception):
-            CUSTOM_TKINTER_AVAILABLE = False
+        else:
             import tkinter.ttk as ttk
-    else:
-        import tkinter.ttk as ttk
-        print("CustomTkinter disabled via DISABLE_CUSTOMTKINTER environment variable")
-except ImportError:
-    GUI_AVAILABLE = False
-    CUSTOM_TKINTER_AVAILABLE = False
+            print("CustomTkinter disabled via DISABLE_CUSTOMTKINTER environment variable")
+    except ImportError:
+        GUI_AVAILABLE = False
+        CUSTOM_TKINTER_AVAILABLE = False
+    
+    return GUI_AVAILABLE
 
 try:
     import pydicom
     from pydicom.errors import InvalidDicomError
+    from pydicom.datadict import tag_for_keyword
 except ImportError:
     print("ERROR: pydicom is not installed.")
     print("Please install it using: pip install pydicom pandas")
     sys.exit(1)
 
+def _available_cpu_count():
+    """Number of CPUs this process may run on (respects CPU affinity / container cpusets)"""
+    if hasattr(os, 'process_cpu_count'):  # Python 3.13+
+        return os.process_cpu_count() or 1
+    try:
+        return len(os.sched_getaffinity(0))  # Linux
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
 # Determine number of workers (use CPU count, but leave one core free)
-MAX_WORKERS = max(1, mp.cpu_count() - 1)
+MAX_WORKERS = max(1, _available_cpu_count() - 1)
+
+# Siemens CSA Series Header (0029,1020) fields holding the multiband (SMS) factor
+# Bytes patterns so the raw CSA blob is searched without decoding it
+_RE_MB_MULTISLICE = re.compile(rb'sKSpace\.ucMultiSliceMode\s*=\s*[\t]+(\d+)')
+_RE_MB_FACTOR = re.compile(rb'sSliceAcceleration\.lMultiBandFactor\s*=\s*[\t]+(\d+)')
+
+# Tags read for every sampled file in gather_info (accessed by tag, not keyword)
+TAG_IMAGE_POSITION = (0x0020, 0x0032)     # ImagePositionPatient
+TAG_INSTANCE_NUMBER = (0x0020, 0x0013)    # InstanceNumber
+TAG_TEMPORAL_POSITION = (0x0020, 0x9128)  # TemporalPositionIndex
+TAG_DIFFUSION_BVALUE = (0x0018, 0x9087)   # DiffusionBValue
+TAG_SIEMENS_BVALUE = (0x0019, 0x100C)     # Siemens private b-value
+TAG_ROWS = (0x0028, 0x0010)               # Rows
+TAG_COLUMNS = (0x0028, 0x0011)            # Columns
+
+# Union of the per-file tags every sampling pass in gather_info needs (dimensions, Z_Dim,
+# b-values, fMRI volumes), so each sampled file is read once and shared by all passes
+SAMPLE_TAGS = [TAG_ROWS, TAG_COLUMNS, TAG_IMAGE_POSITION, TAG_INSTANCE_NUMBER,
+               TAG_TEMPORAL_POSITION, TAG_DIFFUSION_BVALUE, TAG_SIEMENS_BVALUE]
+
+# b-values below this (s/mm²) are effectively b0 - scanners often store b0 volumes as b=5 or b=10
+B0_THRESHOLD = 50
+
+# Tags needed to read a file's b-value (standard and Siemens private)
+BVAL_TAGS = [TAG_DIFFUSION_BVALUE, TAG_SIEMENS_BVALUE]
+
+# Header fields gather_info reads from the reference dataset, fetched together by _batch_get
+SIMPLE_TAGS = (
+    (0x0018, 0x0093),  # PercentSampling
+    (0x0018, 0x0094),  # PercentPhaseFieldOfView
+    (0x0018, 0x1312),  # InPlanePhaseEncodingDirection
+    (0x0018, 0x5100),  # PatientPosition
+    (0x0018, 0x9158),  # ParallelReductionFactorInPlane
+    (0x0018, 0x9159),  # ParallelReductionFactorOutOfPlane
+    (0x0019, 0x100A),  # Siemens iPAT (NumberOfImagesInMosaic for MOSAIC)
+    (0x0019, 0x100B),  # Siemens iPAT (alternative)
+    (0x0043, 0x1083),  # GE ASSET/ARC factor
+    (0x0043, 0x10B6),  # GE Multiband Parameters
+    (0x0051, 0x1011),  # Siemens PATModeText
+    (0x2001, 0x1008),  # Philips SENSE factor
+    TAG_DIFFUSION_BVALUE,
+    TAG_SIEMENS_BVALUE,
+)
+
+# Keyword fields gather_info reads from the reference dataset, resolved to tags once at import
+# (ReceivingCoilName is not a standard keyword, so it resolves to no tag and always reads as None)
+HEADER_KEYWORDS = (
+    'SeriesNumber', 'SeriesDescription', 'Rows', 'Columns', 'ImageType', 'AcquisitionMatrix',
+    'PixelSpacing', 'SliceThickness', 'MRAcquisitionType', 'SpacingBetweenSlices',
+    'InversionTime', 'EchoTime', 'RepetitionTime', 'FlipAngle', 'NumberOfAverages',
+    'PixelBandwidth', 'ReceivingCoilName', 'MagneticFieldStrength', 'ImagePositionPatient',
+    'StudyDescription', 'SeriesDate', 'SeriesTime',
+)
+KEYWORD_TAGS = {keyword: tag_for_keyword(keyword) for keyword in HEADER_KEYWORDS
+                if tag_for_keyword(keyword) is not None}
+
+# Column order of the per-series CSV written by gather_info
+SERIES_CSV_COLUMNS = (
+    'SeriesNumber', 'FolderName', 'SeriesDescription', 'MRAcquisitionType',
+    'X_Dim', 'Y_Dim', 'Z_Dim', 'X_Voxel', 'Y_Voxel', 'Z_Voxel', 'SliceGap',
+    'InversionTime', 'EchoTime', 'RepetitionTime', 'FlipAngle', 'Position',
+    'StudyDescription', 'SeriesAcqTime', 'DiffusionBValue',
+    'MultibandFactor', 'InplaneAccelFactor', 'PhaseEncodingDirection',
+    'NumberOfAverages', 'Bandwidth', 'CoilName', 'SliceOrientation',
+    'MagneticFieldStrength', 'PercentPhaseFOV', 'PercentSampling',
+    'NumberOfVolumes', 'NumberOfB0s',
+)
+
+# Tags needed to organize files into series folders
+ORGANIZE_TAGS = ['SeriesNumber', 'SeriesDescription']
+
+# Every tag read by gather_info - passed as specific_tags so pydicom skips the rest of the header
+GATHER_INFO_TAGS = [
+    'SeriesNumber', 'SeriesDescription', 'StudyDescription', 'SeriesDate', 'SeriesTime',
+    'Rows', 'Columns', 'ImageType', 'AcquisitionMatrix', 'PixelSpacing', 'SliceThickness',
+    'MRAcquisitionType', 'SpacingBetweenSlices', 'InversionTime', 'EchoTime',
+    'RepetitionTime', 'FlipAngle', 'ImagePositionPatient', 'InstanceNumber',
+    'NumberOfAverages', 'PixelBandwidth', 'MagneticFieldStrength',
+    (0x0018, 0x0093),  # PercentSampling
+    (0x0018, 0x0094),  # PercentPhaseFieldOfView
+    (0x0018, 0x1312),  # InPlanePhaseEncodingDirection
+    (0x0018, 0x5100),  # PatientPosition
+    (0x0018, 0x9087),  # DiffusionBValue
+    (0x0018, 0x9158),  # ParallelReductionFactorInPlane
+    (0x0018, 0x9159),  # ParallelReductionFactorOutOfPlane
+    (0x0019, 0x100A),  # Siemens NumberOfImagesInMosaic / iPAT
+    (0x0019, 0x100B),  # Siemens iPAT (alternative)
+    (0x0019, 0x100C),  # Siemens b-value
+    (0x0020, 0x9128),  # TemporalPositionIndex
+    (0x0029, 0x1020),  # Siemens CSA Series Header Info
+    (0x0043, 0x1083),  # GE ASSET/ARC factor
+    (0x0043, 0x10B6),  # GE Multiband Parameters
+    (0x0051, 0x100B),  # Siemens MatrixSize
+    (0x0051, 0x1011),  # Siemens PATModeText
+    (0x2001, 0x1008),  # Philips SENSE factor
+]
+
+
+def _make_executor(cpu_bound, max_workers=None):
+    """Create a process pool for CPU-bound pydicom parsing (GIL-bound), or a thread pool for I/O
+    max_workers defaults to MAX_WORKERS (read at call time, so --workers applies)"""
+    max_workers = max_workers or MAX_WORKERS
+    if cpu_bound:
+        return ProcessPoolExecutor(max_workers=max_workers)
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+# Translation table mapping characters that are invalid in Windows folder names to '_'
+_SANITIZE_TABLE = str.maketrans({c: '_' for c in '<>:"/\\|?*'})
 
 
 def sanitize_folder_name(name):
     """Remove invalid characters from folder name for Windows"""
-    invalid_chars = '<>:"/\\|?*'
-    for char in invalid_chars:
-        name = name.replace(char, '_')
-    name = name.strip(' .')
-    if len(name) > 200:
-        name = name[:200]
-    return name
+    name = name.translate(_SANITIZE_TABLE).strip(' .')
+    return name[:200]
+
+
+# Whitespace and quotes users paste around a path (e.g. from "Copy as path")
+_PATH_STRIP_CHARS = ' \t\r\n"\''
+
 
+def _clean_path_input(text):
+    """Trim surrounding whitespace and quotes from a typed or pasted folder path (inner quotes are kept)"""
+    return text.strip(_PATH_STRIP_CHARS)
 
-def is_dicom_file(file_path):
-    """Check if file is a DICOM file"""
+
+def _output_dirs(base_path):
+    """Return (csv_dir, nii_dir) for a DICOM folder: its "<name>_CSV" and "<name>_nii" siblings"""
+    base_path_obj = Path(base_path)
+    parent, name = base_path_obj.parent, base_path_obj.name
+    return str(parent / f"{name}_CSV"), str(parent / f"{name}_nii")
+
+
+@dataclass(frozen=True)
+class RunPlan:
+    """Input folder and output locations of one GUI processing run"""
+    base_path: str
+    output_path: str
+    merged_csv_path: str
+    nii_dir: str
+
+
+def _plan_paths(folder):
+    """Build the RunPlan for a DICOM folder (the GUI names its summary "<name>_merged.csv")"""
+    output_path, nii_dir = _output_dirs(folder)
+    merged_csv_path = os.path.join(output_path, f"{Path(folder).name}_merged.csv")
+    return RunPlan(folder, output_path, merged_csv_path, nii_dir)
+
+
+class ProcessingCancelled(Exception):
+    """Raised inside the pipeline once its cancel_event has been set"""
+
+
+def _check_cancel(cancel_event):
+    """Raise ProcessingCancelled if cancel_event (a threading.Event, or None) is set"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise ProcessingCancelled("Processing cancelled")
+
+
+def _cancellable(iterable, cancel_event):
+    """Yield the items of iterable, checking cancel_event before each one"""
+    for item in iterable:
+        _check_cancel(cancel_event)
+        yield item
+
+
+def _map_cancellable(executor, func, items, cancel_event, window=None):
+    """Map func over items in executor, yielding (index, result) pairs as the tasks finish (not in order)
+    Only `window` tasks are in flight, each finished one is replaced straight away, and once cancel_event
+    is set nothing more is submitted: the queued tasks are dropped and only the running ones are waited for"""
+    # executor.map submits every item up front, and leaving the with-block then waits for all of them;
+    # taking results as they finish also keeps one slow item (a large series) from idling the other workers
+    window = window or MAX_WORKERS
+    items = enumerate(items)
+    pending = {}  # {future: index of its item}
+    
+    def submit(count):
+        for index, item in itertools.islice(items, count):
+            pending[executor.submit(func, item)] = index
+    
+    submit(window)
     try:
-        # Check file size
-        if os.path.getsize(file_path) < 1024:
-            return False
-        
-        # Try to read as DICOM
-        pydicom.dcmread(file_path, stop_before_pixels=True)
-        return True
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            _check_cancel(cancel_event)
+            # Refill before handing out the results, so the workers stay busy while the caller uses them
+            submit(len(finished))
+            for future in finished:
+                yield pending.pop(future), future.result()
+    finally:
+        # Reached on cancel, on a worker error, or when the caller stops early
+        for future in pending:
+            future.cancel()
+
+
+def is_dicom_file(file_path, strict=False):
+    """Check if file is a DICOM file (128-byte preamble followed by 'DICM')"""
+    try:
+        # Only read the 132-byte header instead of parsing the whole file
+        with open(file_path, 'rb') as f:
+            f.seek(128)
+            if f.read(4) == b'DICM':
+                return True
+    except OSError:
+        return False
+
+    if not strict:
+        return False
+
+    # Slow path: some DICOM files skip the preamble, so try to parse them
+    try:
+        ds = pydicom.dcmread(file_path, stop_before_pixels=True, force=True,
+                             specific_tags=['SOPClassUID'])
+        return 'SOPClassUID' in ds
     except (InvalidDicomError, Exception):
         return False
 
 
-def find_dicom_files(directory, use_parallel=True):
-    """Find all DICOM files in directory"""
+def _check_dicom_batch(file_paths):
+    """Helper function for parallel DICOM detection - probes a whole batch of files per task"""
+    return [is_dicom_file(file_path) for file_path in file_paths]
+
+
+def find_dicom_files(directory, use_parallel=True, cancel_event=None):
+    """Find all DICOM files in directory
+    cancel_event, if given, is checked between files (between batches when parallel)"""
     dicom_files = []
     print(f"  Scanning directory: {directory}")
     
@@ -94,49 +330,68 @@ def find_dicom_files(directory, use_parallel=True):
         print(f"  ERROR: Directory does not exist!")
         return dicom_files
     
-    all_files = list(Path(directory).iterdir())
-    file_items = [f for f in all_files if f.is_file()]
+    # DirEntry.is_file() reuses the type info from the directory listing (no extra stat)
+    # Only the path strings are kept - this is the one full-size list built for the directory
+    with os.scandir(directory) as it:
+        file_paths = [entry.path for entry in it if entry.is_file()]
     
-    print(f"  Found {len(file_items)} files to check")
+    print(f"  Found {len(file_paths)} files to check")
     
-    if len(file_items) == 0:
+    if len(file_paths) == 0:
         return dicom_files
     
     # Show sample file names
-    for i, file_path in enumerate(file_items[:3], 1):
-        print(f"    Sample file {i}: {file_path.name}")
-    if len(file_items) > 3:
-        print(f"    ... and {len(file_items) - 3} more files")
+    for i, file_path in enumerate(file_paths[:3], 1):
+        print(f"    Sample file {i}: {os.path.basename(file_path)}")
+    if len(file_paths) > 3:
+        print(f"    ... and {len(file_paths) - 3} more files")
     
     # Use parallel processing for large file counts
-    if use_parallel and len(file_items) > 10:
+    if use_parallel and len(file_paths) > 10:
         print(f"  Using parallel processing with {MAX_WORKERS} workers...")
-        file_paths = [str(f) for f in file_items]
         
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            results = list(executor.map(is_dicom_file, file_paths))
+        # Submit files in batches so each task amortizes the dispatch overhead
+        # (ThreadPoolExecutor has no chunksize, so batch explicitly)
+        chunksize = max(1, len(file_paths) // (MAX_WORKERS * 8))
+        batches = (file_paths[i:i + chunksize] for i in range(0, len(file_paths), chunksize))
+        
+        # The magic-byte probe is pure I/O, so threads are enough here
+        # Batches finish in any order; each one's flags go back to its place so the files keep scan order
+        is_dicom = [False] * len(file_paths)
+        with _make_executor(cpu_bound=False) as executor:
+            for index, batch_flags in _map_cancellable(executor, _check_dicom_batch, batches, cancel_event):
+                is_dicom[index * chunksize:index * chunksize + len(batch_flags)] = batch_flags
+        dicom_files = [file_path for file_path, flag in zip(file_paths, is_dicom) if flag]
         
-        dicom_files = [file_paths[i] for i, is_dicom in enumerate(results) if is_dicom]
         dicom_count = len(dicom_files)
     else:
         # Sequential processing
         dicom_count = 0
-        for file_path in file_items:
-            if is_dicom_file(str(file_path)):
-                dicom_files.append(str(file_path))
+        for file_path in _cancellable(file_paths, cancel_event):
+            if is_dicom_file(file_path):
+                dicom_files.append(file_path)
                 dicom_count += 1
                 if dicom_count <= 3:
-                    print(f"      -> DICOM file detected: {file_path.name}")
+                    print(f"      -> DICOM file detected: {os.path.basename(file_path)}")
     
-    print(f"  Summary: {len(file_items)} files checked, {dicom_count} DICOM files found")
+    print(f"  Summary: {len(file_paths)} files checked, {dicom_count} DICOM files found")
     return dicom_files
 
 
+def _has_any_dicom(directory):
+    """Check whether a directory directly contains at least one DICOM file (stops at the first one)"""
+    try:
+        with os.scandir(directory) as it:
+            return any(entry.is_file() and is_dicom_file(entry.path) for entry in it)
+    except OSError:
+        return False
+
+
 def _process_single_file_for_organization(args):
     """Helper function for parallel file organization"""
     file_path, _ = args  # base_path not needed here, only for folder creation later
     try:
-        ds = pydicom.dcmread(file_path, stop_before_pixels=True)
+        ds = pydicom.dcmread(file_path, stop_before_pixels=True, specific_tags=ORGANIZE_TAGS)
         
         # Get SeriesNumber and SeriesDescription
         series_num = str(getattr(ds, 'SeriesNumber', 'Unknown'))
@@ -152,128 +407,227 @@ def _process_single_file_for_organization(args):
 
 def check_if_files_organized(base_path):
     """Check if DICOM files are already organized into folders"""
-    base_path_obj = Path(base_path)
-    
-    if not base_path_obj.exists():
-        return False
-    
-    # Get all items in base_path
-    items = list(base_path_obj.iterdir())
-    
-    if not items:
+    if not os.path.exists(base_path):
         return False
     
-    # Check if there are any DICOM files directly in base_path (only files, not subdirectories)
-    file_items = [f for f in items if f.is_file()]
-    dicom_files_in_root = []
-    for file_path in file_items[:10]:  # Sample first 10 files for speed
-        if is_dicom_file(str(file_path)):
-            dicom_files_in_root.append(file_path)
-    
-    # Check if there are organized folders (subdirectories with DICOM files)
-    organized_folders = []
-    dir_items = [f for f in items if f.is_dir()]
+    # Walk the listing of base_path once (file/dir type comes from the DirEntry): only the
+    # subfolders are kept, so an unorganized folder of thousands of files isn't held in memory
+    dir_items = []
+    sampled = 0
+    with os.scandir(base_path) as it:
+        for entry in it:
+            if entry.is_dir():
+                dir_items.append(entry)
+            # Decision logic:
+            # 1. If there are DICOM files in root, files are NOT organized
+            elif sampled < 10 and entry.is_file():  # Sample first 10 files for speed
+                sampled += 1
+                if is_dicom_file(entry.path):
+                    return False
+    
+    # 2. If there is an organized folder (subdirectory with DICOM files), files ARE organized
+    #    One folder is enough, so stop at the first hit
     
     for item in dir_items:
-        # Check if this folder contains DICOM files
+        # Check if this folder contains DICOM files, listing it lazily instead of in full
         try:
-            folder_files = [f for f in item.iterdir() if f.is_file()]
-            for file_path in folder_files[:5]:  # Sample first 5 files
-                if is_dicom_file(str(file_path)):
-                    organized_folders.append(item)
-                    break
+            with os.scandir(item.path) as it:
+                folder_files = (entry for entry in it if entry.is_file())
+                for entry in itertools.islice(folder_files, 5):  # Sample first 5 files
+                    if is_dicom_file(entry.path):
+                        return True
         except PermissionError:
             # Skip folders we can't access
             continue
     
-    # Decision logic:
-    # 1. If there are DICOM files in root, files are NOT organized
-    if dicom_files_in_root:
-        return False
-    
-    # 2. If there are organized folders with DICOM files, files ARE organized
-    if organized_folders:
-        return True
-    
     # 3. If no DICOM files found anywhere, return False (need to search recursively)
     return False
 
 
-def organize_dicom_files(dicom_files, base_path, use_parallel=True):
-    """Organize DICOM files into folders based on SeriesNumber and SeriesDescription"""
+def _process_batch_for_organization(args_batch):
+    """Helper function for parallel file organization - reads a whole batch of files per task"""
+    return [_process_single_file_for_organization(args) for args in args_batch]
+
+
+def _move_file_to_folder(file_path, folder_name, base_path, created_folders):
+    """Move a file into its series folder, creating the folder only the first time it is seen"""
+    new_folder = os.path.join(base_path, folder_name)
+    
+    if folder_name not in created_folders:
+        os.makedirs(new_folder, exist_ok=True)
+        created_folders.add(folder_name)
+    
+    new_file_path = os.path.join(new_folder, os.path.basename(file_path))
+    try:
+        os.replace(file_path, new_file_path)
+    except Exception as e:
+        print(f"  Warning: Error moving {file_path}: {e}")
+
+
+def organize_dicom_files(dicom_files, base_path, use_parallel=True, progress=None, cancel_event=None):
+    """Organize DICOM files into folders based on SeriesNumber and SeriesDescription
+    progress, if given, is called as progress(done, total) as files are handled
+    cancel_event, if given, is checked before each move, so a file is never left half-moved"""
     print(f"  Organizing {len(dicom_files)} DICOM files...")
     
-    if use_parallel and len(dicom_files) > 10:
-        print(f"  Using parallel processing with {MAX_WORKERS} workers...")
-        # Process files in parallel to get folder names
-        args_list = [(file_path, base_path) for file_path in dicom_files]
-        
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            results = list(executor.map(_process_single_file_for_organization, args_list))
-        
-        # Move files sequentially to avoid race conditions
-        for file_path, folder_name, error in results:
+    args_list = [(file_path, base_path) for file_path in dicom_files]
+    created_folders = set()
+    done = 0
+    
+    # Move files sequentially (in this process) to avoid race conditions
+    def move(results):
+        nonlocal done
+        for file_path, folder_name, error in _cancellable(results, cancel_event):
             if error:
                 print(f"  Warning: Error processing {file_path}: {error}")
-                continue
-            
-            if folder_name:
-                new_folder = os.path.join(base_path, folder_name)
-                os.makedirs(new_folder, exist_ok=True)
-                
-                # Move file
-                file_name = os.path.basename(file_path)
-                new_file_path = os.path.join(new_folder, file_name)
-                try:
-                    os.rename(file_path, new_file_path)
-                except Exception as e:
-                    print(f"  Warning: Error moving {file_path}: {e}")
+            elif folder_name:
+                _move_file_to_folder(file_path, folder_name, base_path, created_folders)
+            done += 1
+            if progress:
+                progress(done, len(args_list))
+    
+    if use_parallel and len(dicom_files) > 10:
+        print(f"  Using parallel processing with {MAX_WORKERS} workers...")
+        # Process files in parallel to get folder names, in batches to amortize dispatch
+        chunksize = max(1, len(args_list) // (MAX_WORKERS * 8))
+        batches = [args_list[i:i + chunksize] for i in range(0, len(args_list), chunksize)]
+        
+        # dcmread is pure-Python parsing, so use processes to get around the GIL
+        # Moves start as soon as each batch finishes, overlapping parsing with file I/O
+        with _make_executor(cpu_bound=True) as executor:
+            for _, batch_results in _map_cancellable(executor, _process_batch_for_organization, batches,
+                                                     cancel_event):
+                move(batch_results)
     else:
         # Sequential processing
-        for file_path in dicom_files:
-            try:
-                ds = pydicom.dcmread(file_path, stop_before_pixels=True)
-                
-                # Get SeriesNumber and SeriesDescription
-                series_num = str(getattr(ds, 'SeriesNumber', 'Unknown'))
-                series_desc = str(getattr(ds, 'SeriesDescription', 'Unknown'))
-                
-                folder_name = f"{series_num}_{series_desc}"
-                folder_name = sanitize_folder_name(folder_name)
-                
-                new_folder = os.path.join(base_path, folder_name)
-                os.makedirs(new_folder, exist_ok=True)
-                
-                # Move file
-                file_name = os.path.basename(file_path)
-                new_file_path = os.path.join(new_folder, file_name)
-                os.rename(file_path, new_file_path)
-                
-            except Exception as e:
-                print(f"  Warning: Error processing {file_path}: {e}")
+        move(map(_process_single_file_for_organization, args_list))
+
+
+def _tag_value(ds, tag):
+    """Get the value of a data element by tag, or None if it is missing"""
+    elem = ds.get(tag)
+    return elem.value if elem is not None else None
+
+
+def _batch_get(ds, tags):
+    """Get the values of all present tags in one pass as {tag: value} (unreadable elements are skipped)"""
+    values = {}
+    for tag in tags:
+        try:
+            elem = ds.get(tag)
+        except Exception:
+            continue
+        if elem is not None:
+            values[tag] = elem.value
+    return values
+
+
+def _get_many(ds, keyword_tags):
+    """Get {keyword: value} for every present element in one pass, skipping keyword translation"""
+    tag_values = _batch_get(ds, keyword_tags.values())
+    return {keyword: tag_values[tag] for keyword, tag in keyword_tags.items() if tag in tag_values}
+
+
+def _bval_of(tag_values):
+    """Raw b-value from a {tag: value} dict: DiffusionBValue, else the Siemens private tag"""
+    if TAG_DIFFUSION_BVALUE in tag_values:
+        return tag_values[TAG_DIFFUSION_BVALUE]
+    return tag_values.get(TAG_SIEMENS_BVALUE)
+
+
+def _tally_bvalues(bvals):
+    """Histogram a list of b-values (None entries are skipped) in numpy.
+    Returns (set of unique b-values, number of b0 files (b < B0_THRESHOLD), {other b-value: file count})"""
+    arr = np.array([b for b in bvals if b is not None], dtype=np.float64)
+    uniq, counts = np.unique(arr[~np.isnan(arr)], return_counts=True)
+    is_b0 = uniq < B0_THRESHOLD
+    b0_count = int(counts[is_b0].sum())
+    nonzero_counts = dict(zip(uniq[~is_b0].tolist(), counts[~is_b0].tolist()))
+    return set(uniq.tolist()), b0_count, nonzero_counts
+
+
+def _format_datetime(date_str, time_str):
+    """Format DICOM DA/TM strings (YYYYMMDD, HHMMSS) as 'YYYY-MM-DD-HH:MM'"""
+    if not (date_str and time_str):
+        return ''
+    # Slicing never raises, so no try/except is needed for short strings
+    return f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:8]}-{time_str[:2]}:{time_str[2:4]}"
+
+
+def _csv_value(value):
+    """Format a value for the per-series CSV the same way pandas' to_csv would"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, int):
+        return str(int(value))
+    if isinstance(value, float):
+        # float() first so pydicom DS values are written as floats, not their original string
+        value = float(value)
+        return '' if value != value else repr(value)  # NaN is written as an empty field
+    return str(value)
+
+
+def _dims_ok(rows, cols):
+    """Check if image dimensions are within a reasonable range for MRI
+    (most MRI images are between 64-2048 pixels, but allow a wider range)"""
+    return rows is not None and cols is not None and 32 <= rows <= 8192 and 32 <= cols <= 8192
+
+
+def _read_bval(file_path):
+    """Read the b-value of a single DICOM file as a float, or None if unavailable"""
+    try:
+        ds = pydicom.dcmread(file_path, stop_before_pixels=True, specific_tags=BVAL_TAGS)
+        # DiffusionBValue (0018,9087) takes precedence over the Siemens private tag
+        if TAG_DIFFUSION_BVALUE in ds:
+            bval = _tag_value(ds, TAG_DIFFUSION_BVALUE)
+        else:
+            bval = _tag_value(ds, TAG_SIEMENS_BVALUE)
+        return float(bval) if bval is not None else None
+    except Exception:
+        return None
 
 
 class DICOMCache:
-    """Cache for DICOM files to avoid repeated reads"""
+    """Cache for DICOM files to avoid repeated reads: the one full header plus the sampled tags"""
     def __init__(self):
-        self._cache = {}
+        self._header = None  # (file_path, dataset) of the file read with get_dicom
+        self._tags = {}  # {file_path: {tag: value}} for SAMPLE_TAGS - small, so kept for all files
     
     def get_dicom(self, file_path):
-        """Get DICOM file, use cache if available"""
-        if file_path not in self._cache:
-            try:
-                self._cache[file_path] = pydicom.dcmread(file_path, stop_before_pixels=True)
-            except:
-                return None
-        return self._cache.get(file_path)
+        """Read a file's GATHER_INFO_TAGS header (only the series' first file is read this way)"""
+        try:
+            ds = pydicom.dcmread(file_path, stop_before_pixels=True,
+                                 specific_tags=GATHER_INFO_TAGS)
+        except:
+            return None
+        self._header = (file_path, ds)
+        return ds
+    
+    def get_tags(self, file_path):
+        """Get {tag: value} for the SAMPLE_TAGS present in a file (None if unreadable), use cache if available"""
+        if file_path in self._tags:
+            return self._tags[file_path]
+        # The header already read for the first file holds SAMPLE_TAGS too
+        ds = self._header[1] if self._header and self._header[0] == file_path else None
+        try:
+            if ds is None:
+                ds = pydicom.dcmread(file_path, stop_before_pixels=True, specific_tags=SAMPLE_TAGS)
+            tag_values = _batch_get(ds, SAMPLE_TAGS)
+        except:
+            tag_values = None
+        self._tags[file_path] = tag_values
+        return tag_values
     
     def clear(self):
         """Clear cache"""
-        self._cache.clear()
+        self._header = None
+        self._tags.clear()
 
 
-def gather_info(dicom_files, folder_name, output_path):
-    """Extract DICOM information and save to CSV"""
+def gather_info(dicom_files, folder_name, output_path, save_csv=True):
+    """Extract DICOM information and return it as one formatted CSV row (also saved as a CSV if save_csv)"""
     if not dicom_files:
         return
     
@@ -288,17 +642,19 @@ def gather_info(dicom_files, folder_name, output_path):
             return
         
         # Extract information
-        series_number = getattr(ds, 'SeriesNumber', None)
-        series_description = getattr(ds, 'SeriesDescription', '')
+        # Fetch every keyword field once; missing ones fall back to the same defaults as getattr
+        header = _get_many(ds, KEYWORD_TAGS)
+        series_number = header.get('SeriesNumber')
+        series_description = header.get('SeriesDescription', '')
         
         # Get dimensions (from first DICOM file - should be consistent across all files in a series)
-        rows = getattr(ds, 'Rows', None)
-        columns = getattr(ds, 'Columns', None)
+        rows = header.get('Rows')
+        columns = header.get('Columns')
         
         # CRITICAL: Check for MOSAIC format (Siemens multi-slice format)
         # MOSAIC images have multiple slices tiled into one large image
         # We need to extract the REAL acquisition matrix, not the mosaic matrix
-        image_type = getattr(ds, 'ImageType', [])
+        image_type = header.get('ImageType', [])
         
         # Convert to list if it's a pydicom MultiValue object
         if hasattr(image_type, '__iter__') and not isinstance(image_type, str):
@@ -314,7 +670,7 @@ def gather_info(dicom_files, folder_name, output_path):
             print(f"       ImageType: {image_type_list}")
             
             # Get actual acquisition matrix from DICOM tags
-            acq_matrix = getattr(ds, 'AcquisitionMatrix', None)
+            acq_matrix = header.get('AcquisitionMatrix')
             if acq_matrix and len(acq_matrix) >= 4:
                 print(f"       AcquisitionMatrix: {list(acq_matrix)}")
                 # AcquisitionMatrix format: [freq_rows, freq_cols, phase_rows, phase_cols]
@@ -346,9 +702,14 @@ def gather_info(dicom_files, folder_name, output_path):
                         except Exception as e:
                             print(f"       Warning: Could not parse Siemens matrix size: {e}")
         
+        # Evenly spaced sample (up to 500 files) used for Z_Dim/b-value collection
+        volume_sample_size = min(500, len(dicom_files))
+        volume_sample_indices = [i * len(dicom_files) // volume_sample_size for i in range(volume_sample_size)]
+        
         # Intelligent dimension detection: sample multiple files and use statistical method
         # CRITICAL: Skip sampling if MOSAIC was detected - MOSAIC correction is authoritative
         # If we sample after MOSAIC correction, we'll read 800x800 and overwrite the correct 160x160!
+        dimension_sample_indices = []
         if not is_mosaic:
             print(f"    -> Running intelligent dimension detection...")
             # INCREASED sampling: use 20% of files, at least 10, at most 100
@@ -356,73 +717,20 @@ def gather_info(dicom_files, folder_name, output_path):
             sample_size = max(10, min(100, len(dicom_files) // 5))
             
             # Better sampling strategy: evenly spaced indices across the entire dataset
-            if sample_size >= len(dicom_files):
+            # Drawn from volume_sample_indices so both samples are covered by one pass below
+            if sample_size >= len(volume_sample_indices):
                 # Sample all files if dataset is small
-                sample_indices = list(range(len(dicom_files)))
+                dimension_sample_indices = volume_sample_indices
             else:
                 # Evenly spaced samples
-                step = len(dicom_files) / sample_size
-                sample_indices = [int(i * step) for i in range(sample_size)]
-            
-            dimension_counts = {}  # {(rows, cols): count}
-            all_dimensions = []  # List of all valid dimensions found
+                step = len(volume_sample_indices) / sample_size
+                dimension_sample_indices = [volume_sample_indices[int(i * step)] for i in range(sample_size)]
             
             # DEBUG: Print sampling info
-            print(f"       Sampling {len(sample_indices)} files out of {len(dicom_files)} for dimension detection")
-            
-            for idx in sample_indices:
-                if idx >= len(dicom_files):
-                    continue
-                ds_check = cache.get_dicom(dicom_files[idx])
-                if ds_check:
-                    rows_check = getattr(ds_check, 'Rows', None)
-                    cols_check = getattr(ds_check, 'Columns', None)
-                    if rows_check and cols_check:
-                        # Dynamic threshold: use reasonable range based on typical MRI dimensions
-                        # Most MRI images are between 64-2048 pixels, but allow wider range
-                        # Check if dimensions are within reasonable bounds (not hard-coded)
-                        is_reasonable = (
-                            rows_check >= 32 and rows_check <= 8192 and
-                            cols_check >= 32 and cols_check <= 8192
-                        )
-                        
-                        if is_reasonable:
-                            dim_key = (rows_check, cols_check)
-                            dimension_counts[dim_key] = dimension_counts.get(dim_key, 0) + 1
-                            all_dimensions.append(dim_key)
-            
-            # DEBUG: Print all found dimensions
-            if dimension_counts:
-                print(f"       Found dimensions: {dict(dimension_counts)}")
-            
-            # Determine dimensions using statistical method (mode/consensus)
-            if dimension_counts:
-                # Find the most common dimension (mode/consensus)
-                most_common_dim = max(dimension_counts.items(), key=lambda x: x[1])[0]
-                most_common_count = dimension_counts[most_common_dim]
-                consensus_ratio = most_common_count / len(all_dimensions) if all_dimensions else 0
-                
-                # ALWAYS use the most common dimension if we have any valid dimensions
-                # This ensures we don't use outlier values like 800x800
-                rows, columns = most_common_dim
-                original_dim = (getattr(ds, 'Rows', None), getattr(ds, 'Columns', None))
-                if (rows, columns) != original_dim:
-                    print(f"    -> Using consensus dimensions: {rows} x {columns} (found in {most_common_count}/{len(all_dimensions)} sampled files, {consensus_ratio*100:.1f}%)")
-                    print(f"    -> Rejected first file dimensions: {original_dim}")
-                else:
-                    print(f"    -> Using dimensions from first file: {rows} x {columns} (confirmed by sampling)")
-            else:
-                # No valid dimensions found in sample - check if first file is reasonable
-                if rows and columns:
-                    if rows < 32 or rows > 8192 or columns < 32 or columns > 8192:
-                        print(f"    Warning: Dimensions {rows} x {columns} are outside typical range, but no alternatives found in sampled files")
-                    else:
-                        print(f"    -> Using dimensions from first file: {rows} x {columns} (no sampling data)")
-                else:
-                    print(f"    Warning: Could not determine dimensions from sampled files")
-        else:
-            # MOSAIC format detected - trust the MOSAIC correction, skip sampling
-            print(f"    -> Skipping dimension sampling (MOSAIC correction is authoritative: {rows}x{columns})")
+            print(f"       Sampling {len(dimension_sample_indices)} files out of {len(dicom_files)} for dimension detection")
+        
+        dimension_sample_set = set(dimension_sample_indices)
+        dimension_counts = Counter()  # {(rows, cols): count}
         
         # Calculate Z_Dim (number of slices per volume) correctly - OPTIMIZED: single pass with cache
         # SPECIAL CASE: For MOSAIC format, Z_Dim = NumberOfImagesInMosaic
@@ -438,42 +746,49 @@ def gather_info(dicom_files, folder_name, output_path):
         temporal_positions = set()
         bvalue_to_files = {}  # {bvalue: set of files}
         
-        # Single pass: collect all needed information at once
-        sample_size = min(500, len(dicom_files))
-        sample_indices = [i * len(dicom_files) // sample_size for i in range(sample_size)] if sample_size > 0 else [0]
+        # Single fused pass over the union of both samples: collect all needed information at once
+        # Dimension samples come first so the early exit below never cuts dimension detection short
+        sample_indices = dimension_sample_indices + [
+            i for i in volume_sample_indices if i not in dimension_sample_set]
+        
+        # Early exit: once the set of slice positions stops growing, further samples add nothing.
+        # The streak needed scales with the number of positions (file order may be random), and we
+        # never stop early once b-values show up since every b-value matters for volume counting
+        stable_streak = 0
         
         try:
             for idx in sample_indices:
-                if idx >= len(dicom_files):
-                    continue
-                ds_sample = cache.get_dicom(dicom_files[idx])
-                if ds_sample is None:
+                # Each file is read once for SAMPLE_TAGS; the b-value and fMRI passes reuse the result
+                sample_values = cache.get_tags(dicom_files[idx])
+                if sample_values is None:
                     continue
                 
+                # Collect dimensions
+                if idx in dimension_sample_set:
+                    rows_check = sample_values.get(TAG_ROWS)
+                    cols_check = sample_values.get(TAG_COLUMNS)
+                    if _dims_ok(rows_check, cols_check):
+                        dimension_counts[(rows_check, cols_check)] += 1
+                
                 # Collect slice positions
-                img_pos = getattr(ds_sample, 'ImagePositionPatient', None)
+                num_positions = len(slice_positions)
+                img_pos = sample_values.get(TAG_IMAGE_POSITION)
                 if img_pos and len(img_pos) >= 3:
                     slice_positions.add(round(float(img_pos[2]), 2))
+                stable_streak = stable_streak + 1 if len(slice_positions) == num_positions else 0
                 
                 # Collect instance numbers
-                instance_num = getattr(ds_sample, 'InstanceNumber', None)
+                instance_num = sample_values.get(TAG_INSTANCE_NUMBER)
                 if instance_num is not None:
                     instance_numbers.add(instance_num)
                 
                 # Collect temporal positions
-                if (0x0020, 0x9128) in ds_sample:
-                    temporal_pos = ds_sample[0x0020, 0x9128].value
-                    if temporal_pos is not None:
-                        temporal_positions.add(temporal_pos)
+                temporal_pos = sample_values.get(TAG_TEMPORAL_POSITION)
+                if temporal_pos is not None:
+                    temporal_positions.add(temporal_pos)
                 
                 # Collect b-values (for volume detection)
-                bval = None
-                if hasattr(ds_sample, 'DiffusionBValue'):
-                    bval = getattr(ds_sample, 'DiffusionBValue', None)
-                elif (0x0018, 0x9087) in ds_sample:
-                    bval = ds_sample[0x0018, 0x9087].value
-                elif (0x0019, 0x100c) in ds_sample:
-                    bval = ds_sample[0x0019, 0x100c].value
+                bval = _bval_of(sample_values)
                 
                 if bval is not None:
                     try:
@@ -483,6 +798,10 @@ def gather_info(dicom_files, folder_name, output_path):
                         bvalue_to_files[bval_float].add(dicom_files[idx])
                     except:
                         pass
+                
+                if (idx not in dimension_sample_set and not bvalue_to_files and len(slice_positions) >= 2
+                        and stable_streak >= max(32, 4 * len(slice_positions))):
+                    break
             
             # Determine Z_Dim from collected data
             # BUT: For MOSAIC, Z_Dim was already set from NumberOfImagesInMosaic, don't overwrite!
@@ -500,25 +819,62 @@ def gather_info(dicom_files, folder_name, output_path):
             if z_dim is None:
                 z_dim = len(dicom_files)  # Fallback
         
+        if not is_mosaic:
+            # DEBUG: Print all found dimensions
+            if dimension_counts:
+                print(f"       Found dimensions: {dict(dimension_counts)}")
+            
+            # Determine dimensions using statistical method (mode/consensus)
+            if dimension_counts:
+                # Find the most common dimension (mode/consensus)
+                most_common_dim, most_common_count = dimension_counts.most_common(1)[0]
+                total_dimensions = sum(dimension_counts.values())
+                consensus_ratio = most_common_count / total_dimensions if total_dimensions else 0
+                
+                # ALWAYS use the most common dimension if we have any valid dimensions
+                # This ensures we don't use outlier values like 800x800
+                rows, columns = most_common_dim
+                original_dim = (header.get('Rows'), header.get('Columns'))
+                if (rows, columns) != original_dim:
+                    print(f"    -> Using consensus dimensions: {rows} x {columns} (found in {most_common_count}/{total_dimensions} sampled files, {consensus_ratio*100:.1f}%)")
+                    print(f"    -> Rejected first file dimensions: {original_dim}")
+                else:
+                    print(f"    -> Using dimensions from first file: {rows} x {columns} (confirmed by sampling)")
+            else:
+                # No valid dimensions found in sample - check if first file is reasonable
+                if rows and columns:
+                    if not _dims_ok(rows, columns):
+                        print(f"    Warning: Dimensions {rows} x {columns} are outside typical range, but no alternatives found in sampled files")
+                    else:
+                        print(f"    -> Using dimensions from first file: {rows} x {columns} (no sampling data)")
+                else:
+                    print(f"    Warning: Could not determine dimensions from sampled files")
+        else:
+            # MOSAIC format detected - trust the MOSAIC correction, skip sampling
+            print(f"    -> Skipping dimension sampling (MOSAIC correction is authoritative: {rows}x{columns})")
+        
         # Get pixel spacing
-        pixel_spacing = getattr(ds, 'PixelSpacing', None)
+        pixel_spacing = header.get('PixelSpacing')
         x_voxel = pixel_spacing[0] if pixel_spacing and len(pixel_spacing) >= 2 else None
         y_voxel = pixel_spacing[1] if pixel_spacing and len(pixel_spacing) >= 2 else None
-        z_voxel = getattr(ds, 'SliceThickness', None)
+        z_voxel = header.get('SliceThickness')
         
         # Other fields
-        mr_acq_type = str(getattr(ds, 'MRAcquisitionType', ''))
-        slice_gap = getattr(ds, 'SpacingBetweenSlices', None)
+        mr_acq_type = str(header.get('MRAcquisitionType', ''))
+        slice_gap = header.get('SpacingBetweenSlices')
         
-        inversion_time = getattr(ds, 'InversionTime', None)
-        echo_time = getattr(ds, 'EchoTime', None)
-        repetition_time = getattr(ds, 'RepetitionTime', None)
-        flip_angle = getattr(ds, 'FlipAngle', None)
+        inversion_time = header.get('InversionTime')
+        echo_time = header.get('EchoTime')
+        repetition_time = header.get('RepetitionTime')
+        flip_angle = header.get('FlipAngle')
         
         # Multiband factor extraction (slice/through-plane acceleration)
         # IMPORTANT: Multiband (SMS) is DIFFERENT from in-plane acceleration (iPAT/GRAPPA)
         # - Multiband/SMS: simultaneously excites multiple slices (reduces TR)
         # - iPAT/GRAPPA: parallel imaging within a single slice (reduces phase encoding steps)
+        # Fetch every simple header field once; the blocks below only look values up
+        tag_values = _batch_get(ds, SIMPLE_TAGS)
+        
         multiband_factor = None
         try:
             # PRIORITY 1: Siemens CSA Header - ucMultiSliceMode (most accurate!)
@@ -527,12 +883,10 @@ def gather_info(dicom_files, folder_name, output_path):
                 try:
                     csa_data = ds[0x0029, 0x1020].value
                     if isinstance(csa_data, bytes):
-                        csa_str = csa_data.decode('latin-1', errors='ignore')
-                        
                         # Try ucMultiSliceMode first (most reliable for SMS/Multiband)
-                        match = re.search(r'sKSpace\.ucMultiSliceMode\s*=\s*[\t]+(\d+)', csa_str)
+                        match = _RE_MB_MULTISLICE.search(csa_data)
                         if match:
-                            val = int(match.group(1))
+                            val = int(match.group(1).decode('ascii'))
                             if val >= 1:  # ucMultiSliceMode represents the actual MB factor
                                 multiband_factor = float(val)
                                 if val > 1:
@@ -540,9 +894,9 @@ def gather_info(dicom_files, folder_name, output_path):
                         
                         # Fallback: try lMultiBandFactor (older/alternative field)
                         if multiband_factor is None:
-                            match = re.search(r'sSliceAcceleration\.lMultiBandFactor\s*=\s*[\t]+(\d+)', csa_str)
+                            match = _RE_MB_FACTOR.search(csa_data)
                             if match:
-                                val = int(match.group(1))
+                                val = int(match.group(1).decode('ascii'))
                                 if val >= 1:
                                     multiband_factor = float(val)
                                     if val > 1:
@@ -551,16 +905,16 @@ def gather_info(dicom_files, folder_name, output_path):
                     pass
             
             # PRIORITY 2: Standard DICOM tag for ParallelReductionFactorOutOfPlane (multiband)
-            if multiband_factor is None and (0x0018, 0x9159) in ds:
-                val = ds[0x0018, 0x9159].value
+            if multiband_factor is None and (0x0018, 0x9159) in tag_values:
+                val = tag_values[0x0018, 0x9159]
                 if isinstance(val, (int, float)) and val >= 1:
                     multiband_factor = float(val)
             
             # PRIORITY 3: Siemens PATModeText for SLICE acceleration (multiband/SMS)
             # Format: "s2", "s3", etc. ('s' = slice acceleration)
             # NOTE: 'p' prefix is in-plane (iPAT), NOT multiband!
-            if multiband_factor is None and (0x0051, 0x1011) in ds:
-                pat_text = str(ds[0x0051, 0x1011].value)
+            if multiband_factor is None and (0x0051, 0x1011) in tag_values:
+                pat_text = str(tag_values[0x0051, 0x1011])
                 # Only extract if it starts with 's' (slice acceleration = multiband)
                 if pat_text.startswith('s') and len(pat_text) > 1:
                     try:
@@ -571,8 +925,8 @@ def gather_info(dicom_files, folder_name, output_path):
                         pass
             
             # PRIORITY 4: GE private tag (0043,10B6) - Multiband Parameters
-            if multiband_factor is None and (0x0043, 0x10B6) in ds:
-                mb_params = ds[0x0043, 0x10B6].value
+            if multiband_factor is None and (0x0043, 0x10B6) in tag_values:
+                mb_params = tag_values[0x0043, 0x10B6]
                 if mb_params:
                     try:
                         if isinstance(mb_params, (list, tuple)) and len(mb_params) > 0:
@@ -591,8 +945,8 @@ def gather_info(dicom_files, folder_name, output_path):
         try:
             # PRIORITY 1: Siemens PATModeText (0051,1011) - most reliable for Siemens
             # Format: "p2", "p3", "p4", etc. or "s2", "s3" for slice acceleration
-            if (0x0051, 0x1011) in ds:
-                pat_text = str(ds[0x0051, 0x1011].value)
+            if (0x0051, 0x1011) in tag_values:
+                pat_text = str(tag_values[0x0051, 0x1011])
                 # Parse "p3" -> 3, "p2" -> 2, etc.
                 # 'p' prefix indicates in-plane acceleration
                 if pat_text.startswith('p') and len(pat_text) > 1:
@@ -604,8 +958,8 @@ def gather_info(dicom_files, folder_name, output_path):
                         pass
             
             # PRIORITY 2: Standard DICOM tag for ParallelReductionFactorInPlane
-            if inplane_accel_factor is None and (0x0018, 0x9158) in ds:
-                val = ds[0x0018, 0x9158].value
+            if inplane_accel_factor is None and (0x0018, 0x9158) in tag_values:
+                val = tag_values[0x0018, 0x9158]
                 # Validate: inplane acceleration factor is typically 1-8, rarely up to 16
                 if isinstance(val, (int, float)) and 1 <= val <= 16:
                     inplane_accel_factor = float(val)
@@ -614,24 +968,24 @@ def gather_info(dicom_files, folder_name, output_path):
             # WARNING: (0019,100A) is NumberOfImagesInMosaic for MOSAIC format, NOT iPAT!
             # Only use if NOT a MOSAIC image
             if inplane_accel_factor is None and not is_mosaic:
-                if (0x0019, 0x100A) in ds:  # Siemens iPAT factor (but NOT for MOSAIC!)
-                    val = ds[0x0019, 0x100A].value
+                if (0x0019, 0x100A) in tag_values:  # Siemens iPAT factor (but NOT for MOSAIC!)
+                    val = tag_values[0x0019, 0x100A]
                     if isinstance(val, (int, float)) and 1 <= val <= 16:
                         inplane_accel_factor = float(val)
-                elif (0x0019, 0x100B) in ds:  # Alternative Siemens tag
-                    val = ds[0x0019, 0x100B].value
+                elif (0x0019, 0x100B) in tag_values:  # Alternative Siemens tag
+                    val = tag_values[0x0019, 0x100B]
                     if isinstance(val, (int, float)) and 1 <= val <= 16:
                         inplane_accel_factor = float(val)
             
             # PRIORITY 4: GE ASSET/ARC factor
-            if inplane_accel_factor is None and (0x0043, 0x1083) in ds:
-                val = ds[0x0043, 0x1083].value
+            if inplane_accel_factor is None and (0x0043, 0x1083) in tag_values:
+                val = tag_values[0x0043, 0x1083]
                 if isinstance(val, (int, float)) and 1 <= val <= 16:
                     inplane_accel_factor = float(val)
             
             # PRIORITY 5: Philips SENSE factor
-            if inplane_accel_factor is None and (0x2001, 0x1008) in ds:
-                val = ds[0x2001, 0x1008].value
+            if inplane_accel_factor is None and (0x2001, 0x1008) in tag_values:
+                val = tag_values[0x2001, 0x1008]
                 if isinstance(val, (int, float)) and 1 <= val <= 16:
                     inplane_accel_factor = float(val)
         except:
@@ -640,72 +994,45 @@ def gather_info(dicom_files, folder_name, output_path):
         # Additional useful fields
         # Phase encoding direction
         phase_encoding_direction = None
-        try:
-            if (0x0018, 0x1312) in ds:  # InPlanePhaseEncodingDirection
-                phase_encoding_direction = str(ds[0x0018, 0x1312].value)
-        except:
-            pass
+        if (0x0018, 0x1312) in tag_values:  # InPlanePhaseEncodingDirection
+            phase_encoding_direction = str(tag_values[0x0018, 0x1312])
         
         # Number of averages
-        number_of_averages = getattr(ds, 'NumberOfAverages', None)
+        number_of_averages = header.get('NumberOfAverages')
         
         # Bandwidth
-        bandwidth = getattr(ds, 'PixelBandwidth', None)
+        bandwidth = header.get('PixelBandwidth')
         
         # Coil information
-        coil_name = getattr(ds, 'ReceivingCoilName', None)
+        coil_name = header.get('ReceivingCoilName')
         
         # Slice orientation
         slice_orientation = None
-        try:
-            if (0x0018, 0x5100) in ds:  # PatientPosition
-                slice_orientation = str(ds[0x0018, 0x5100].value)
-        except:
-            pass
+        if (0x0018, 0x5100) in tag_values:  # PatientPosition
+            slice_orientation = str(tag_values[0x0018, 0x5100])
         
         # Magnetic field strength
-        magnetic_field_strength = getattr(ds, 'MagneticFieldStrength', None)
+        magnetic_field_strength = header.get('MagneticFieldStrength')
         
         # Percent phase field of view
-        percent_phase_fov = None
-        try:
-            if (0x0018, 0x0094) in ds:  # PercentPhaseFieldOfView
-                percent_phase_fov = ds[0x0018, 0x0094].value
-        except:
-            pass
+        percent_phase_fov = tag_values.get((0x0018, 0x0094))  # PercentPhaseFieldOfView
         
         # Percent sampling
-        percent_sampling = None
-        try:
-            if (0x0018, 0x0093) in ds:  # PercentSampling
-                percent_sampling = ds[0x0018, 0x0093].value
-        except:
-            pass
+        percent_sampling = tag_values.get((0x0018, 0x0093))  # PercentSampling
         
         # Position
-        img_pos = getattr(ds, 'ImagePositionPatient', None)
+        img_pos = header.get('ImagePositionPatient')
         position = ''
         if img_pos and len(img_pos) >= 3:
             position = f"{img_pos[0]:.4f},{img_pos[1]:.4f},{img_pos[2]:.4f}"
         
         # Study info
-        study_desc = str(getattr(ds, 'StudyDescription', ''))
+        study_desc = str(header.get('StudyDescription', ''))
         
         # Format datetime
-        series_date = getattr(ds, 'SeriesDate', '')
-        series_time = getattr(ds, 'SeriesTime', '')
-        
-        def format_datetime(date_str, time_str):
-            if date_str and time_str:
-                try:
-                    date_part = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:8]}"
-                    time_part = f"{time_str[:2]}:{time_str[2:4]}"
-                    return f"{date_part}-{time_part}"
-                except:
-                    return ''
-            return ''
-        
-        series_acq_time = format_datetime(series_date, series_time)
+        series_date = header.get('SeriesDate', '')
+        series_time = header.get('SeriesTime', '')
+        series_acq_time = _format_datetime(series_date, series_time)
         
         # ===== Diffusion MRI and multi-volume sequences =====
         # Try to get diffusion b-value (standard tag 0018,9087)
@@ -714,46 +1041,44 @@ def gather_info(dicom_files, folder_name, output_path):
         num_volumes = None  # Total number of volumes (temporal dimension)
         num_b0s = None      # Number of b0 volumes (only for diffusion MRI)
         
-        try:
-            # Standard DICOM tag for b-value (0018,9087)
-            if hasattr(ds, 'DiffusionBValue'):
-                diffusion_bvalue = getattr(ds, 'DiffusionBValue', None)
-            # Try accessing via tag
-            elif (0x0018, 0x9087) in ds:
-                diffusion_bvalue = ds[0x0018, 0x9087].value
-            # Alternative private tags (vendor specific)
-            elif (0x0019, 0x100c) in ds:  # Siemens
-                diffusion_bvalue = ds[0x0019, 0x100c].value
-        except:
-            pass
+        # Standard DICOM tag for b-value (0018,9087)
+        if TAG_DIFFUSION_BVALUE in tag_values:
+            diffusion_bvalue = tag_values[TAG_DIFFUSION_BVALUE]
+        # Alternative private tags (vendor specific)
+        elif TAG_SIEMENS_BVALUE in tag_values:  # Siemens
+            diffusion_bvalue = tag_values[TAG_SIEMENS_BVALUE]
         
         # Check for .bval file first (most reliable for diffusion MRI volume counting)
         bval_file = None
-        folder_path_obj = Path(dicom_files[0]).parent if dicom_files else None
-        
-        if folder_path_obj and folder_path_obj.exists():
-            # Look for .bval file in the folder
-            for bval_candidate in folder_path_obj.glob('*.bval'):
-                bval_file = bval_candidate
-                break
+        bval_size = 0
+        folder_path = os.path.dirname(dicom_files[0]) if dicom_files else None
+        
+        if folder_path and os.path.isdir(folder_path):
+            # Look for .bval file in the folder (suffix check on scandir entries, no Path objects)
+            with os.scandir(folder_path) as it:
+                for entry in it:
+                    if entry.name.endswith('.bval') and entry.is_file():
+                        bval_file = entry.path
+                        bval_size = entry.stat().st_size
+                        break
         
         # Try to read volumes from .bval file (most accurate for diffusion MRI)
-        if bval_file and bval_file.exists():
+        # An empty sidecar says nothing, so skip it and fall back to the DICOM analysis below
+        if bval_file and bval_size > 0:
             try:
-                with open(bval_file, 'r') as f:
-                    bval_content = f.read().strip()
-                    bval_values = [float(x) for x in bval_content.split() if x.strip()]
-                    num_volumes = len(bval_values)
-                    num_b0s = len([b for b in bval_values if b == 0])
-                    is_diffusion_mri = True
-                    print(f"    -> Read from .bval file: {num_volumes} volumes, {num_b0s} b0s")
-                    # If we have volumes from .bval, we can calculate Z_Dim accurately
-                    # BUT: For MOSAIC, Z_Dim was already correctly set from NumberOfImagesInMosaic!
-                    if num_volumes > 1 and len(dicom_files) > num_volumes and not is_mosaic:
-                        calculated_z_dim = len(dicom_files) // num_volumes
-                        if calculated_z_dim > 0:
-                            z_dim = calculated_z_dim
-                            print(f"    -> Calculated Z_Dim from .bval: {z_dim} slices per volume")
+                # Read and parse in numpy (sep=' ' matches any whitespace, including newlines)
+                bval_values = np.fromfile(bval_file, sep=' ')
+                num_volumes = int(bval_values.size)
+                num_b0s = int(np.count_nonzero(bval_values < B0_THRESHOLD))
+                is_diffusion_mri = True
+                print(f"    -> Read from .bval file: {num_volumes} volumes, {num_b0s} b0s")
+                # If we have volumes from .bval, we can calculate Z_Dim accurately
+                # BUT: For MOSAIC, Z_Dim was already correctly set from NumberOfImagesInMosaic!
+                if num_volumes > 1 and len(dicom_files) > num_volumes and not is_mosaic:
+                    calculated_z_dim = len(dicom_files) // num_volumes
+                    if calculated_z_dim > 0:
+                        z_dim = calculated_z_dim
+                        print(f"    -> Calculated Z_Dim from .bval: {z_dim} slices per volume")
             except Exception as e:
                 print(f"    -> Warning: Error reading .bval file: {e}")
         
@@ -770,70 +1095,52 @@ def gather_info(dicom_files, folder_name, output_path):
                 if bvalue_to_files:
                     # Use data already collected in Z_Dim calculation
                     unique_bvalues = set(bvalue_to_files.keys())
-                    b0_file_count = len(bvalue_to_files.get(0.0, set()))
                     for bval, files in bvalue_to_files.items():
-                        if bval != 0:
+                        # Same b0 rule as the .bval path: low b-values (b=5, b=10) count as b0
+                        if bval < B0_THRESHOLD:
+                            b0_file_count += len(files)
+                        else:
                             bvalue_file_count[bval] = len(files)
                 else:
                     # Need to sample files
                     sample_size = min(100, len(dicom_files))
                     sample_indices = [i * len(dicom_files) // sample_size for i in range(sample_size)] if sample_size > 0 else [0]
                     
+                    sampled_bvalues = []
                     for idx in sample_indices:
                         if idx >= len(dicom_files):
                             continue
-                        ds_sample = cache.get_dicom(dicom_files[idx])
-                        if ds_sample is None:
+                        sample_values = cache.get_tags(dicom_files[idx])
+                        if sample_values is None:
                             continue
                         
                         # Get b-value
-                        bval = None
-                        if hasattr(ds_sample, 'DiffusionBValue'):
-                            bval = getattr(ds_sample, 'DiffusionBValue', None)
-                        elif (0x0018, 0x9087) in ds_sample:
-                            bval = ds_sample[0x0018, 0x9087].value
-                        elif (0x0019, 0x100c) in ds_sample:  # Siemens
-                            bval = ds_sample[0x0019, 0x100c].value
+                        bval = _bval_of(sample_values)
                         
                         if bval is not None:
                             try:
-                                bval_float = float(bval)
-                                unique_bvalues.add(bval_float)
-                                if bval_float == 0:
-                                    b0_file_count += 1
-                                else:
-                                    bvalue_file_count[bval_float] = bvalue_file_count.get(bval_float, 0) + 1
+                                sampled_bvalues.append(float(bval))
                             except:
                                 pass
+                    
+                    # Tally all sampled b-values at once
+                    unique_bvalues, b0_file_count, bvalue_file_count = _tally_bvalues(sampled_bvalues)
                 
                 # If we found b-values, this is diffusion MRI
                 if len(unique_bvalues) > 0:
                     is_diffusion_mri = True
                     # Count all files to get accurate b-value distribution
                     if len(dicom_files) <= 500:  # Only count all files if reasonable number
-                        unique_bvalues_full = set()
-                        b0_file_count_full = 0
-                        for dicom_file in dicom_files:
-                            try:
-                                ds_sample = pydicom.dcmread(dicom_file, stop_before_pixels=True)
-                                bval = None
-                                if hasattr(ds_sample, 'DiffusionBValue'):
-                                    bval = getattr(ds_sample, 'DiffusionBValue', None)
-                                elif (0x0018, 0x9087) in ds_sample:
-                                    bval = ds_sample[0x0018, 0x9087].value
-                                elif (0x0019, 0x100c) in ds_sample:
-                                    bval = ds_sample[0x0019, 0x100c].value
-                                
-                                if bval is not None:
-                                    try:
-                                        bval_float = float(bval)
-                                        unique_bvalues_full.add(bval_float)
-                                        if bval_float == 0:
-                                            b0_file_count_full += 1
-                                    except:
-                                        pass
-                            except:
-                                continue
+                        if bvalue_to_files:
+                            # Z_Dim pass sampled every file of a series this size (and never stops
+                            # early once b-values appear), so its b-values are already complete
+                            unique_bvalues_full = set(bvalue_to_files.keys())
+                            b0_file_count_full = b0_file_count
+                        else:
+                            # Read serially: gather_info usually runs in a pool worker already
+                            all_bvalues = [_read_bval(dicom_file) for dicom_file in dicom_files]
+                            
+                            unique_bvalues_full, b0_file_count_full, _ = _tally_bvalues(all_bvalues)
                         
                         # NumberOfVolumes = number of unique b-values (each b-value represents one volume)
                         num_volumes = len(unique_bvalues_full)
@@ -864,8 +1171,12 @@ def gather_info(dicom_files, folder_name, output_path):
                     instance_numbers = set()
                     temporal_positions = set()
                     
+                    # Only the tags present in the first file are worth sampling for; if it has
+                    # neither, the series relies on other tags and the loop below would find nothing
+                    fmri_tags = [tag for tag in (TAG_INSTANCE_NUMBER, TAG_TEMPORAL_POSITION) if tag in ds]
+                    
                     # Use already collected data from cache if available
-                    if not temporal_positions and not instance_numbers:
+                    if not temporal_positions and not instance_numbers and fmri_tags:
                         # Need to collect data
                         sample_size = min(200, len(dicom_files))
                         sample_indices = [i * len(dicom_files) // sample_size for i in range(sample_size)] if sample_size > 0 else [0]
@@ -873,19 +1184,19 @@ def gather_info(dicom_files, folder_name, output_path):
                         for idx in sample_indices:
                             if idx >= len(dicom_files):
                                 continue
-                            ds_sample = cache.get_dicom(dicom_files[idx])
-                            if ds_sample is None:
+                            # Files sampled by the Z_Dim pass are not read again
+                            sample_values = cache.get_tags(dicom_files[idx])
+                            if sample_values is None:
                                 continue
                             
-                            instance_num = getattr(ds_sample, 'InstanceNumber', None)
+                            instance_num = sample_values.get(TAG_INSTANCE_NUMBER)
                             if instance_num is not None:
                                 instance_numbers.add(instance_num)
                             
                             # Check TemporalPositionIndex (for multi-volume sequences)
-                            if (0x0020, 0x9128) in ds_sample:
-                                temporal_pos = ds_sample[0x0020, 0x9128].value
-                                if temporal_pos is not None:
-                                    temporal_positions.add(temporal_pos)
+                            temporal_pos = sample_values.get(TAG_TEMPORAL_POSITION)
+                            if temporal_pos is not None:
+                                temporal_positions.add(temporal_pos)
                     
                     # Estimate volumes from instance numbers or temporal positions
                     if len(temporal_positions) > 1:
@@ -905,45 +1216,45 @@ def gather_info(dicom_files, folder_name, output_path):
         
         # ===== End Diffusion MRI and multi-volume fields =====
         
-        # Create output structure with units
+        # Create output structure with units (one scalar per column - the CSV has exactly 1 row)
         output_data = {
-            'SeriesNumber': [series_number],
-            'FolderName': [folder_name],
-            'SeriesDescription': [series_description],
-            'MRAcquisitionType': [mr_acq_type],
-            'X_Dim': [columns],  # pixels
-            'Y_Dim': [rows],  # pixels
-            'Z_Dim': [z_dim],  # slices
-            'X_Voxel': [x_voxel],  # mm
-            'Y_Voxel': [y_voxel],  # mm
-            'Z_Voxel': [z_voxel],  # mm
-            'SliceGap': [slice_gap],  # mm
-            'InversionTime': [inversion_time],  # ms
-            'EchoTime': [echo_time],  # ms
-            'RepetitionTime': [repetition_time],  # ms
-            'FlipAngle': [flip_angle],  # degrees
-            'Position': [position],  # x,y,z coordinates
-            'StudyDescription': [study_desc],
-            'SeriesAcqTime': [series_acq_time],
-            'DiffusionBValue': [diffusion_bvalue],  # s/mm²
+            'SeriesNumber': series_number,
+            'FolderName': folder_name,
+            'SeriesDescription': series_description,
+            'MRAcquisitionType': mr_acq_type,
+            'X_Dim': columns,  # pixels
+            'Y_Dim': rows,  # pixels
+            'Z_Dim': z_dim,  # slices
+            'X_Voxel': x_voxel,  # mm
+            'Y_Voxel': y_voxel,  # mm
+            'Z_Voxel': z_voxel,  # mm
+            'SliceGap': slice_gap,  # mm
+            'InversionTime': inversion_time,  # ms
+            'EchoTime': echo_time,  # ms
+            'RepetitionTime': repetition_time,  # ms
+            'FlipAngle': flip_angle,  # degrees
+            'Position': position,  # x,y,z coordinates
+            'StudyDescription': study_desc,
+            'SeriesAcqTime': series_acq_time,
+            'DiffusionBValue': diffusion_bvalue,  # s/mm²
             # Parallel imaging and acceleration factors
-            'MultibandFactor': [multiband_factor],  # factor
-            'InplaneAccelFactor': [inplane_accel_factor],  # factor
+            'MultibandFactor': multiband_factor,  # factor
+            'InplaneAccelFactor': inplane_accel_factor,  # factor
             # Additional fields
-            'PhaseEncodingDirection': [phase_encoding_direction],
-            'NumberOfAverages': [number_of_averages],  # count
-            'Bandwidth': [bandwidth],  # Hz/pixel
-            'CoilName': [coil_name],
-            'SliceOrientation': [slice_orientation],
+            'PhaseEncodingDirection': phase_encoding_direction,
+            'NumberOfAverages': number_of_averages,  # count
+            'Bandwidth': bandwidth,  # Hz/pixel
+            'CoilName': coil_name,
+            'SliceOrientation': slice_orientation,
             # New fields
-            'MagneticFieldStrength': [magnetic_field_strength],  # T (Tesla)
-            'PercentPhaseFOV': [percent_phase_fov],  # %
-            'PercentSampling': [percent_sampling]  # %
+            'MagneticFieldStrength': magnetic_field_strength,  # T (Tesla)
+            'PercentPhaseFOV': percent_phase_fov,  # %
+            'PercentSampling': percent_sampling  # %
         }
         
         # Only add NumberOfVolumes if it's a multi-volume sequence (diffusion MRI, fMRI, etc.)
         if num_volumes is not None and num_volumes > 1:
-            output_data['NumberOfVolumes'] = [num_volumes]
+            output_data['NumberOfVolumes'] = num_volumes
             
             # CRITICAL: For MOSAIC format, Z_Dim is ALREADY correct from NumberOfImagesInMosaic
             # DO NOT recalculate it from total_files / num_volumes!
@@ -954,198 +1265,247 @@ def gather_info(dicom_files, folder_name, output_path):
                 if calculated_z_dim > 0:
                     z_dim = calculated_z_dim
                     # CRITICAL: Replace Z_Dim value, don't append
-                    output_data['Z_Dim'] = [z_dim]  # This replaces the existing value
+                    output_data['Z_Dim'] = z_dim  # This replaces the existing value
                     print(f"    -> Corrected Z_Dim: {z_dim} slices per volume (total files: {len(dicom_files)}, volumes: {num_volumes})")
             else:
                 # For MOSAIC: keep the Z_Dim from NumberOfImagesInMosaic
                 print(f"    -> MOSAIC Z_Dim preserved: {z_dim} slices per volume (from NumberOfImagesInMosaic)")
         else:
-            output_data['NumberOfVolumes'] = [None]
+            output_data['NumberOfVolumes'] = None
         
         # Only add NumberOfB0s if it's diffusion MRI
         if is_diffusion_mri:
-            output_data['NumberOfB0s'] = [num_b0s if num_b0s is not None else None]
+            output_data['NumberOfB0s'] = num_b0s
         else:
-            output_data['NumberOfB0s'] = [None]
-        
-        # Ensure all values are single scalar values (not lists) for DataFrame creation
-        # Convert all list values to single scalar values
-        cleaned_output_data = {}
-        for key, value_list in output_data.items():
-            if isinstance(value_list, list):
-                if len(value_list) == 0:
-                    cleaned_output_data[key] = None
-                elif isinstance(value_list[0], (list, tuple)):
-                    # Nested list - take first element of first element
-                    cleaned_output_data[key] = value_list[0][0] if len(value_list[0]) > 0 else None
-                else:
-                    # Single value in list - extract it (should always be length 1)
-                    cleaned_output_data[key] = value_list[0]
-            else:
-                # Not a list - use as is
-                cleaned_output_data[key] = value_list
-        
-        # Debug: Check for any remaining list/tuple values that might cause multiple rows
-        for key, value in cleaned_output_data.items():
-            if isinstance(value, (list, tuple)):
-                print(f"    WARNING: {key} is still a list/tuple: {value}, taking first element")
-                cleaned_output_data[key] = value[0] if len(value) > 0 else None
-        
-        # Create DataFrame from single-row dictionary - explicitly create as single row
-        # CRITICAL: Use pd.DataFrame([dict]) to ensure exactly 1 row
-        df = pd.DataFrame([cleaned_output_data])  # Wrap in list to ensure single row
-        
-        # DEBUG: Print cleaned data to check for issues
-        if len(df) != 1:
-            print(f"    ERROR: DataFrame has {len(df)} rows instead of 1 for {folder_name}")
-            print(f"    DataFrame shape: {df.shape}")
-            print(f"    First few rows:")
-            print(df.head())
-            print(f"    Columns with list/tuple values:")
-            for col in df.columns:
-                col_values = df[col].tolist()
-                has_list = any(isinstance(v, (list, tuple)) for v in col_values)
-                if has_list:
-                    print(f"      {col}: {col_values}")
-            # Force to 1 row by taking first row
-            df = df.iloc[[0]].copy()
-            print(f"    -> Forced to 1 row")
-        
-        # DOUBLE CHECK: Ensure exactly 1 row
-        if len(df) > 1:
-            print(f"    CRITICAL: Still {len(df)} rows after force, taking first row only")
-            df = df.iloc[[0]].copy()
-        
-        csv_path = os.path.join(output_path, f"{folder_name}.csv")
-        
-        # FINAL CHECK: Verify DataFrame has exactly 1 row before saving
-        if len(df) != 1:
-            print(f"    CRITICAL ERROR: DataFrame still has {len(df)} rows before saving!")
-            print(f"    Taking first row only...")
-            df = df.iloc[[0]].copy()
-        
-        # Save CSV
-        df.to_csv(csv_path, index=False)
-        
-        # Verify saved CSV has only 1 row
-        try:
-            verify_df = pd.read_csv(csv_path)
-            if len(verify_df) != 1:
-                print(f"    WARNING: Saved CSV has {len(verify_df)} rows! Reading and fixing...")
-                # Re-read and keep only first row
-                verify_df = verify_df.iloc[[0]].copy()
-                verify_df.to_csv(csv_path, index=False)
-                print(f"    -> Fixed CSV to 1 row")
-        except Exception as e:
-            print(f"    Warning: Could not verify CSV file: {e}")
+            output_data['NumberOfB0s'] = None
+        
+        row = [_csv_value(output_data[col]) for col in SERIES_CSV_COLUMNS]
+        
+        if save_csv:
+            csv_path = os.path.join(output_path, f"{folder_name}.csv")
+            
+            # Save CSV - the schema is fixed and there is exactly 1 row, so write it directly
+            # with the csv module instead of building a DataFrame for it
+            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f, lineterminator=os.linesep)
+                writer.writerow(SERIES_CSV_COLUMNS)
+                writer.writerow(row)
+            
+            print(f"    -> Generated CSV: {csv_path} (1 row, {len(SERIES_CSV_COLUMNS)} columns)")
         
-        print(f"    -> Generated CSV: {csv_path} (1 row, {len(df.columns)} columns)")
+        return row
         
     except Exception as e:
         print(f"  Error processing folder {folder_name}: {e}")
+    finally:
+        cache.clear()
 
 
 def _process_single_folder(args):
-    """Helper function for parallel folder processing"""
-    folder_path, folder_name, output_path = args
-    try:
-        dicom_files = find_dicom_files(folder_path, use_parallel=False)  # Don't parallelize nested calls
-        if dicom_files:
-            gather_info(dicom_files, folder_name, output_path)
-            return (folder_name, True, None)
-        return (folder_name, False, None)
-    except Exception as e:
-        return (folder_name, False, str(e))
+    """Helper function for parallel folder processing (runs in a worker process)
+    All paths are plain strings - find_dicom_files and gather_info only use os/os.path"""
+    folder_path, folder_name, output_path, save_csv = args
+    # Capture this folder's log and hand it back, so the parent prints it in one piece
+    # (a worker's own stdout would be lost, or would touch the GUI log from another process)
+    log = io.StringIO()
+    with redirect_stdout(log):
+        try:
+            dicom_files = find_dicom_files(folder_path, use_parallel=False)  # Don't parallelize nested calls
+            if dicom_files:
+                row = gather_info(dicom_files, folder_name, output_path, save_csv)
+                return (folder_name, row, None, log.getvalue())
+            return (folder_name, None, None, log.getvalue())
+        except Exception as e:
+            return (folder_name, None, str(e), log.getvalue())
 
 
-def process_dicom_folders(base_path, output_path, use_parallel=True):
-    """Process all folders containing DICOM files"""
-    folders = [f for f in Path(base_path).iterdir() if f.is_dir() and f.name not in ['.', '..']]
+def process_dicom_folders(base_path, output_path, use_parallel=True, save_per_series=True, progress=None,
+                          cancel_event=None):
+    """Process all folders containing DICOM files and return their summary rows
+    Per-series CSVs are only written to output_path if save_per_series
+    progress, if given, is called as progress(done, total) after each folder
+    cancel_event, if given, is checked between folders"""
+    # Plain string paths all the way down: workers get small picklable args and never build Path objects
+    base_path, output_path = os.fspath(base_path), os.fspath(output_path)
+    # os.scandir caches the entry type, so is_dir() needs no extra stat per entry
+    with os.scandir(base_path) as it:
+        folders = [entry for entry in it if entry.is_dir() and entry.name not in ['.', '..']]
     print(f"  Found {len(folders)} folders to process")
     
     if len(folders) == 0:
-        return
+        return []
     
-    csv_count = 0
+    rows = []
     
     if use_parallel and len(folders) > 5:
         print(f"  Using parallel processing with {MAX_WORKERS} workers...")
-        args_list = [(str(folder), folder.name, output_path) for folder in folders]
-        
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            results = list(executor.map(_process_single_folder, args_list))
-        
-        for folder_name, success, error in results:
-            if error:
-                print(f"  Error processing folder {folder_name}: {error}")
-            elif success:
-                csv_count += 1
+        args_list = [(folder.path, folder.name, output_path, save_per_series) for folder in folders]
+        
+        # gather_info is mostly pure-Python work that holds the GIL, so use processes;
+        # each folder reads its files serially to avoid oversubscribing the workers
+        # Folders finish in any order; rows are put back in scan order so the summary doesn't vary
+        folder_rows = [None] * len(args_list)
+        with _make_executor(cpu_bound=True) as executor:
+            results = _map_cancellable(executor, _process_single_folder, args_list, cancel_event)
+            for done, (index, (folder_name, row, error, log)) in enumerate(results, 1):
+                print(log, end='')
+                if error:
+                    print(f"  Error processing folder {folder_name}: {error}")
+                else:
+                    folder_rows[index] = row
+                if progress:
+                    progress(done, len(folders))
+        rows = [row for row in folder_rows if row is not None]
     else:
         # Sequential processing
-        for folder in folders:
-            dicom_files = find_dicom_files(str(folder), use_parallel=False)
+        for done, folder in enumerate(_cancellable(folders, cancel_event), 1):
+            dicom_files = find_dicom_files(folder.path, use_parallel=False)
             if dicom_files:
                 print(f"  Processing folder {folder.name} ({len(dicom_files)} DICOM files)...")
-                gather_info(dicom_files, folder.name, output_path)
-                csv_count += 1
-    
-    print(f"Processed {len(folders)} folders, generated {csv_count} CSV files")
+                row = gather_info(dicom_files, folder.name, output_path, save_per_series)
+                if row is not None:
+                    rows.append(row)
+            if progress:
+                progress(done, len(folders))
+    
+    if save_per_series:
+        print(f"Processed {len(folders)} folders, generated {len(rows)} CSV files")
+    else:
+        print(f"Processed {len(folders)} folders, collected {len(rows)} series")
+    return rows
+
+
+def _series_folder_names(rows):
+    """Return the set of folder names in process_dicom_folders rows (each of those folders holds DICOM files)"""
+    folder_col = SERIES_CSV_COLUMNS.index('FolderName')
+    return {row[folder_col] for row in rows}
+
+
+# Column order of the merged summary CSV
+ESSENTIAL_COLUMNS = ('SeriesNumber', 'FolderName', 'SeriesDescription',
+                     'MRAcquisitionType', 'X_Dim', 'Y_Dim', 'Z_Dim', 'X_Voxel', 'Y_Voxel', 'Z_Voxel',
+                     'SliceGap', 'InversionTime', 'EchoTime',
+                     'RepetitionTime', 'FlipAngle', 'Position', 'StudyDescription',
+                     'SeriesAcqTime',
+                     'DiffusionBValue', 'NumberOfVolumes', 'NumberOfB0s',
+                     'MultibandFactor', 'InplaneAccelFactor',
+                     'PhaseEncodingDirection', 'NumberOfAverages', 'Bandwidth',
+                     'CoilName', 'SliceOrientation',
+                     'MagneticFieldStrength', 'PercentPhaseFOV', 'PercentSampling')
+
+# read_csv usecols filter: per-series columns outside the summary (FOVs, TE list, ...) are never parsed
+_ESSENTIAL_COLUMN_SET = frozenset(ESSENTIAL_COLUMNS)
+_USECOLS = _ESSENTIAL_COLUMN_SET.__contains__
+
+# Summary columns left empty (NaN) when missing from a CSV; the other columns default to ''
+NUMERIC_COLUMNS = frozenset([
+    'SeriesNumber', 'X_Dim', 'Y_Dim', 'Z_Dim', 'X_Voxel', 'Y_Voxel', 'Z_Voxel', 'SliceGap',
+    'InversionTime', 'EchoTime', 'RepetitionTime', 'FlipAngle',
+    'MultibandFactor', 'InplaneAccelFactor', 'NumberOfAverages', 'Bandwidth',
+    'MagneticFieldStrength', 'PercentPhaseFOV', 'PercentSampling'])
 
 
 def _read_and_process_csv(csv_file):
     """Helper function for parallel CSV reading"""
-    essential_columns = ['SeriesNumber', 'FolderName', 'SeriesDescription',
-                        'MRAcquisitionType', 'X_Dim', 'Y_Dim', 'Z_Dim', 'X_Voxel', 'Y_Voxel', 'Z_Voxel',
-                        'SliceGap', 'InversionTime', 'EchoTime',
-                        'RepetitionTime', 'FlipAngle', 'Position', 'StudyDescription',
-                        'SeriesAcqTime',
-                        'DiffusionBValue', 'NumberOfVolumes', 'NumberOfB0s',
-                        'MultibandFactor', 'InplaneAccelFactor',
-                        'PhaseEncodingDirection', 'NumberOfAverages', 'Bandwidth',
-                        'CoilName', 'SliceOrientation',
-                        'MagneticFieldStrength', 'PercentPhaseFOV', 'PercentSampling']
-    
+    import pandas as pd
     try:
-        df = pd.read_csv(csv_file)
-        # Ensure all columns exist
-        for col in essential_columns:
-            if col not in df.columns:
-                if col in ['SeriesNumber', 'X_Fov', 'Y_Fov', 'Z_Fov', 'X_Dim', 'Y_Dim', 
-                          'Z_Dim', 'X_Voxel', 'Y_Voxel', 'Z_Voxel', 'SliceGap', 
-                          'InversionTime', 'EchoTime', 'RepetitionTime', 'FlipAngle',
-                          'MultibandFactor', 'InplaneAccelFactor', 'NumberOfAverages', 'Bandwidth',
-                          'MagneticFieldStrength', 'PercentPhaseFOV', 'PercentSampling']:
-                    df[col] = None
-                else:
-                    df[col] = ''
-        
-        df = df[essential_columns]
+        df = pd.read_csv(csv_file, usecols=_USECOLS)
+        # Drop repeated folders within the file before it is concatenated (the merged frame
+        # is deduplicated again); per-series CSVs have a single row, so skip them
+        if len(df) > 1 and 'FolderName' in df.columns:
+            df = df.drop_duplicates(subset=['FolderName'], keep='first')
+        # Ensure all columns exist, in order: reindex adds missing ones as NaN in one step,
+        # then missing text columns get '' instead
+        present = set(df.columns)
+        missing_text_columns = [col for col in ESSENTIAL_COLUMNS
+                                if col not in present and col not in NUMERIC_COLUMNS]
+        df = df.reindex(columns=ESSENTIAL_COLUMNS)
+        if missing_text_columns:
+            df[missing_text_columns] = ''
         return (df, None)
     except Exception as e:
         return (None, str(e))
 
 
+def _scandir_recursive(path):
+    """Yield DirEntry objects for every file below path (symlinked folders are not followed)"""
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _scandir_recursive(entry.path)
+                else:
+                    yield entry
+    except OSError:
+        return
+
+
+def _has_nii_files(nii_base_dir):
+    """Check whether any .nii/.nii.gz file exists below nii_base_dir (stops at the first one)
+    The overwrite prompt only needs to know that some exist, so nothing is counted"""
+    if not os.path.isdir(nii_base_dir):
+        return False
+    return any(entry.name.endswith(('.nii', '.nii.gz')) for entry in _scandir_recursive(nii_base_dir))
+
+
+def _list_csv_files(output_path):
+    """Return the paths of the .csv files directly inside output_path as plain strings"""
+    with os.scandir(output_path) as it:
+        return [entry.path for entry in it
+                if entry.name.endswith('.csv') and entry.is_file(follow_symlinks=False)]
+
+
+def _count_csv_files(output_path):
+    """Count the .csv files directly inside output_path (0 if it does not exist)"""
+    if not os.path.isdir(output_path):
+        return 0
+    with os.scandir(output_path) as it:
+        return sum(1 for entry in it if entry.name.endswith('.csv') and entry.is_file())
+
+
+# Files dcm2niix writes for a series: image, BIDS sidecar and diffusion gradient tables
+NII_OUTPUT_SUFFIXES = ('.nii', '.nii.gz', '.json', '.bval', '.bvec')
+
+
+def _remove_output_files(directory, suffixes, recursive=False):
+    """Delete our generated files (matched by suffix) in directory and return how many were removed
+    Folders and any other files are left in place"""
+    if not os.path.isdir(directory):
+        return 0
+    if recursive:
+        entries = _scandir_recursive(directory)
+    else:
+        with os.scandir(directory) as it:
+            entries = [entry for entry in it if not entry.is_dir()]
+    removed = 0
+    for entry in entries:
+        if entry.name.endswith(suffixes):
+            try:
+                os.unlink(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
 def check_and_ask_overwrite_csv(output_path, merged_csv_filename, gui_mode=False, root=None):
     """Check if CSV files exist and ask user if they want to overwrite"""
-    output_path_obj = Path(output_path)
-    csv_files = list(output_path_obj.glob('*.csv')) if output_path_obj.exists() else []
-    merged_csv_path = output_path_obj / merged_csv_filename
+    csv_count = _count_csv_files(output_path)
+    merged_csv_path = Path(output_path) / merged_csv_filename
     
-    if csv_files or merged_csv_path.exists():
+    if csv_count or merged_csv_path.exists():
         if gui_mode and GUI_AVAILABLE and root:
             # GUI mode - must use root.after to call from main thread
-            import queue
-            import threading
             result_queue = queue.Queue()
             event = threading.Event()
             
             def ask_in_main_thread():
                 try:
-                    from tkinter import messagebox
+                    # messagebox was bound at module level by _init_gui (GUI_AVAILABLE is checked above)
                     response = messagebox.askyesno(
                         "CSV Files Exist",
                         f"CSV files already exist in:\n{output_path}\n\n"
-                        f"Found {len(csv_files)} CSV file(s).\n"
+                        f"Found {csv_count} CSV file(s).\n"
                         f"Summary CSV: {merged_csv_path.name}\n\n"
                         "Do you want to overwrite them?",
                         icon='question'
@@ -1170,7 +1530,7 @@ def check_and_ask_overwrite_csv(output_path, merged_csv_filename, gui_mode=False
             print("WARNING: CSV files already exist!")
             print(f"{'='*70}")
             print(f"Output directory: {output_path}")
-            print(f"Found {len(csv_files)} CSV file(s)")
+            print(f"Found {csv_count} CSV file(s)")
             if merged_csv_path.exists():
                 print(f"Summary CSV: {merged_csv_path.name}")
             print("\nDo you want to overwrite existing CSV files?")
@@ -1181,26 +1541,20 @@ def check_and_ask_overwrite_csv(output_path, merged_csv_filename, gui_mode=False
 
 def check_and_ask_overwrite_nii(nii_base_dir, gui_mode=False, root=None):
     """Check if NIfTI files exist and ask user if they want to overwrite"""
-    nii_base_dir_obj = Path(nii_base_dir)
-    
-    if nii_base_dir_obj.exists():
-        # Check if directory has any files
-        nii_files = list(nii_base_dir_obj.rglob('*.nii*'))
-        if nii_files:
+    if os.path.exists(nii_base_dir):
+        # Check if directory has any NIfTI files (stops at the first one)
+        if _has_nii_files(nii_base_dir):
             if gui_mode and GUI_AVAILABLE and root:
                 # GUI mode - must use root.after to call from main thread
-                import queue
-                import threading
                 result_queue = queue.Queue()
                 event = threading.Event()
                 
                 def ask_in_main_thread():
                     try:
-                        from tkinter import messagebox
+                        # messagebox was bound at module level by _init_gui (GUI_AVAILABLE is checked above)
                         response = messagebox.askyesno(
                             "NIfTI Files Exist",
                             f"NIfTI files already exist in:\n{nii_base_dir}\n\n"
-                            f"Found {len(nii_files)} NIfTI file(s).\n\n"
                             "Do you want to overwrite them?",
                             icon='question'
                         )
@@ -1224,14 +1578,192 @@ def check_and_ask_overwrite_nii(nii_base_dir, gui_mode=False, root=None):
                 print("WARNING: NIfTI files already exist!")
                 print(f"{'='*70}")
                 print(f"NIfTI directory: {nii_base_dir}")
-                print(f"Found {len(nii_files)} NIfTI file(s)")
                 print("\nDo you want to overwrite existing NIfTI files?")
                 response = input("Enter 'yes' to overwrite, or 'no' to skip: ").strip().lower()
                 return response in ['yes', 'y']
     return True  # No existing files, proceed
 
 
-def run_dcm2niix_on_folders(base_path, dcm2niix_path='dcm2niix', use_parallel=True):
+# dcm2niix is killed if a single folder takes longer than this (seconds)
+DCM2NIIX_TIMEOUT = 300
+# Lines of dcm2niix output kept for the error report of a failed folder
+DCM2NIIX_ERROR_TAIL_LINES = 5
+# dcm2niix is disk-bound, so more concurrent conversions than this only compete for bandwidth
+DCM2NIIX_MAX_WORKERS = 4
+# With auto_workers, the worker count keeps doubling only while throughput improves by this much
+DCM2NIIX_MIN_SPEEDUP = 1.15
+# Folders per worker in each measured wave, so start-up and the slowest folder don't dominate a wave
+DCM2NIIX_RAMP_ROUNDS = 3
+
+
+# Record of each folder's last conversion, kept in the NIfTI base folder (see run_dcm2niix_on_folders)
+DCM2NIIX_MANIFEST = 'conversion_manifest.json'
+
+
+def _newest_mtime(directory):
+    """Newest modification time of the files directly inside directory (0 if there are none)"""
+    with os.scandir(directory) as it:
+        return max((entry.stat().st_mtime for entry in it if entry.is_file()), default=0)
+
+
+def _output_names(nii_dir):
+    """Names of the dcm2niix output files directly inside nii_dir"""
+    try:
+        with os.scandir(nii_dir) as it:
+            return sorted(entry.name for entry in it if entry.name.endswith(NII_OUTPUT_SUFFIXES))
+    except OSError:
+        return []
+
+
+def _load_manifest(path):
+    """Read a conversion manifest ({folder name: record}); a missing or unreadable one is empty"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def _write_manifest(path, manifest):
+    """Write the manifest atomically: readers see the old or the new file, never a partial one"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _nii_newer_than(nii_dir, mtime):
+    """Check whether nii_dir holds a NIfTI image and JSON sidecar, with the image newer than mtime"""
+    newest_nii, has_json = None, False
+    try:
+        with os.scandir(nii_dir) as it:
+            for entry in it:
+                if entry.name.endswith(('.nii', '.nii.gz')):
+                    nii_mtime = entry.stat().st_mtime
+                    newest_nii = nii_mtime if newest_nii is None else max(newest_nii, nii_mtime)
+                elif entry.name.endswith('.json'):
+                    has_json = True
+    except OSError:
+        return False
+    if newest_nii is None or not has_json:
+        return False
+    return newest_nii > mtime
+
+
+def _folder_bytes(path):
+    """Total size of the files directly inside path"""
+    with os.scandir(path) as it:
+        return sum(entry.stat().st_size for entry in it if entry.is_file())
+
+
+# Poison pill telling a _run_pipeline thread that no more items are coming
+_PIPELINE_DONE = object()
+
+
+def _run_pipeline(func, items, workers):
+    """Run func over an iterator of items on worker threads, yielding results as they finish
+    A producer thread pulls items into a bounded queue, so a slow source (such as a directory
+    scan) overlaps with the work but can't run far ahead of it; memory stays O(workers) items.
+    Workers stop at a poison pill. An exception raised by func or the source is re-raised here."""
+    todo = queue.Queue(maxsize=2 * workers)
+    done = queue.Queue()
+    stop = threading.Event()  # set after an error: the producer stops, workers skip what's queued
+    
+    def produce():
+        try:
+            for item in items:
+                if stop.is_set():
+                    break
+                todo.put(item)
+        except BaseException as e:
+            done.put((None, e))
+        finally:
+            for _ in range(workers):
+                todo.put(_PIPELINE_DONE)
+    
+    def work():
+        while True:
+            item = todo.get()
+            if item is _PIPELINE_DONE:
+                break
+            if stop.is_set():
+                continue
+            try:
+                done.put((func(item), None))
+            except BaseException as e:
+                done.put((None, e))
+        done.put(_PIPELINE_DONE)
+    
+    threads = [threading.Thread(target=produce, daemon=True)]
+    threads += [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    
+    # The calling thread collects the results while the others scan and convert
+    error = None
+    running = workers
+    try:
+        while running:
+            entry = done.get()
+            if entry is _PIPELINE_DONE:
+                running -= 1
+            elif entry[1] is not None:
+                stop.set()
+                error = error or entry[1]
+            else:
+                yield entry[0]
+    finally:
+        stop.set()
+    if error is not None:
+        raise error
+
+
+def _map_ramping_workers(func, folders, max_workers, on_workers=None):
+    """Map func over an iterator of folders, measuring the throughput (DICOM MB/s) as it goes
+    Waves of DCM2NIIX_RAMP_ROUNDS folders per worker run with 1, 2, 4, ... workers while each step
+    is at least DCM2NIIX_MIN_SPEEDUP times faster; the remaining folders go through _run_pipeline
+    with the last worker count that paid off. on_workers, if given, is called with each worker count
+    before folders are run with it. Returns the results."""
+    results = []
+    workers, best, best_rate = 1, 1, None
+    while True:
+        if on_workers:
+            on_workers(workers)
+        # Several folders per worker: the rate is then bytes over a steady stretch of work,
+        # not one folder's start-up or the single slowest folder of the wave
+        wave = list(itertools.islice(folders, workers * DCM2NIIX_RAMP_ROUNDS))
+        if not wave:
+            return results
+        size = sum(_folder_bytes(folder.path) for folder in wave)
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results.extend(executor.map(func, wave))
+        rate = size / max(time.monotonic() - start, 1e-6)
+        print(f"  Throughput with {workers} worker(s): {rate / 1e6:.1f} MB/s over {len(wave)} folder(s)")
+        
+        if best_rate is not None and rate < best_rate * DCM2NIIX_MIN_SPEEDUP:
+            break  # this step didn't pay off - keep the last count that did
+        best, best_rate = workers, rate
+        if workers >= max_workers or len(wave) < workers * DCM2NIIX_RAMP_ROUNDS:
+            break
+        # The last step may be clamped (e.g. 4 -> 6), so best is remembered rather than halved back
+        workers = min(workers * 2, max_workers)
+    
+    workers = best
+    if on_workers:
+        on_workers(workers)
+    print(f"  Converting the remaining folders with {workers} worker(s)...\n")
+    if workers > 1:
+        results.extend(_run_pipeline(func, folders, workers))
+    else:
+        results.extend(map(func, folders))
+    return results
+
+
+def run_dcm2niix_on_folders(base_path, dcm2niix_path='dcm2niix', use_parallel=True, dicom_folders=None,
+                            cancel_event=None, auto_workers=False, skip_existing=False, pin_cpus=False):
     """
     Run dcm2niix on each organized folder separately.
     This avoids the issue where dcm2niix only processes the last file.
@@ -1240,6 +1772,19 @@ def run_dcm2niix_on_folders(base_path, dcm2niix_path='dcm2niix', use_parallel=Tr
         base_path: Base directory containing organized DICOM folders
         dcm2niix_path: Path to dcm2niix executable (default: 'dcm2niix')
         use_parallel: Whether to process folders in parallel
+        dicom_folders: Optional set of folder names already known to contain DICOM files
+                       (e.g. from process_dicom_folders); only the other folders are probed
+        cancel_event: Optional threading.Event checked before each folder is converted
+        auto_workers: Find the worker count from measured throughput (up to the
+                      DCM2NIIX_MAX_WORKERS cap) instead of always using the cap
+        skip_existing: Don't convert folders whose NIfTI output is newer than their DICOM files,
+                       so an interrupted conversion can be resumed
+        pin_cpus: Pin each parallel worker's conversions to one CPU (Linux only). Off by default:
+                  every run pins from the first CPU, so runs sharing a node would stack up
+    
+    Each folder's result (status, exit code, newest DICOM mtime, output files) is recorded in
+    DCM2NIIX_MANIFEST in the NIfTI base folder. With skip_existing, a folder recorded as converted
+    whose DICOM files haven't changed since is skipped without inspecting its output.
     """
     base_path_obj = Path(base_path)
     
@@ -1247,156 +1792,327 @@ def run_dcm2niix_on_folders(base_path, dcm2niix_path='dcm2niix', use_parallel=Tr
         print(f"ERROR: Directory {base_path} does not exist!")
         return
     
-    # Find all folders containing DICOM files
-    folders = []
-    for item in base_path_obj.iterdir():
-        if item.is_dir():
-            # Check if folder contains DICOM files
-            dicom_files = find_dicom_files(str(item), use_parallel=False)
-            if dicom_files:
-                folders.append(item)
-    
-    if not folders:
-        print(f"No folders with DICOM files found in {base_path}")
-        return
-    
-    print(f"Found {len(folders)} folders with DICOM files")
-    print(f"Running dcm2niix on each folder separately...\n")
-    
-    # Create base output directory for NIfTI files
-    nii_base_dir = base_path_obj.parent / f"{base_path_obj.name}_nii"
-    nii_base_dir.mkdir(parents=True, exist_ok=True)
-    
-    def process_folder(folder_path):
-        """Process a single folder with dcm2niix"""
+    # Find the folders containing DICOM files lazily, so conversion starts with the first one found
+    # os.scandir's DirEntry caches the entry type, so is_dir() needs no extra stat per entry
+    known = dicom_folders or ()
+    
+    def dicom_folders_found():
+        with os.scandir(base_path) as it:
+            for entry in it:
+                # Only one DICOM file is needed to qualify, so don't list the whole folder
+                if entry.is_dir() and (entry.name in known or _has_any_dicom(entry.path)):
+                    yield entry
+    
+    print(f"Running dcm2niix on each folder with DICOM files separately...\n")
+    
+    # Base output directory for NIfTI files (created with the first folder's output directory)
+    nii_base_dir = Path(_output_dirs(base_path_obj)[1])
+    manifest_path = str(nii_base_dir / DCM2NIIX_MANIFEST)
+    previous = _load_manifest(manifest_path) if skip_existing else {}
+    
+    # dcm2niix options shared by every folder - built once, each folder only adds -z, -o and its input
+    # Use -f to specify output filename pattern: %d_%t_%3s = Date_Time_SeriesNumber
+    # Use -z y to compress output (-z i when folders are converted in parallel, see below)
+    # Use -b y to save BIDS sidecar (includes .bval and .bvec for diffusion)
+    # Use -s y to save single file (don't split series)
+    # Use -m y to merge 2D slices from same series
+    # Use -ba y to anonymize BIDS sidecar
+    # Pattern format: %d = SeriesDate, %t = SeriesTime, %3s = SeriesNumber (3 digits)
+    # -z y compresses with pigz, which starts its own threads; with one dcm2niix per worker
+    # that oversubscribes the CPUs, so conversions that run alongside others use the
+    # single-threaded internal compressor. The choice follows the worker count in use right now,
+    # which the throughput ramp changes as it goes (set below, before the folders are run)
+    active_workers = 1
+    
+    def use_workers(count):
+        nonlocal active_workers
+        active_workers = count
+    
+    # On request, with one single-threaded dcm2niix per worker, pin each worker thread's conversions
+    # to one of our CPUs (Linux only) so the kernel doesn't migrate them across sockets mid-run
+    cpus = None
+    if pin_cpus and use_parallel and hasattr(os, 'sched_setaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+    worker_cpu = threading.local()
+    next_cpu = itertools.count()
+    
+    def pin_to_worker_cpu(pid):
+        """Restrict process pid to the CPU assigned to the calling worker thread"""
+        if not hasattr(worker_cpu, 'cpu'):
+            worker_cpu.cpu = cpus[next(next_cpu) % len(cpus)]
+        try:
+            os.sched_setaffinity(pid, {worker_cpu.cpu})
+        except OSError:
+            pass  # dcm2niix already exited, or pinning is not permitted here
+    # The executable is looked up on PATH once here rather than by every spawn, and an absolute
+    # program path keeps working without a chdir into the folder
+    base_cmd = [
+        shutil.which(dcm2niix_path) or dcm2niix_path,
+        '-b', 'y',      # Save BIDS sidecar (.json)
+        '-s', 'y',      # Save single file (don't split series)
+        '-m', 'y',      # Merge 2D slices from same series
+        '-ba', 'n',     # Don't anonymize BIDS sidecar (keep all info)
+        '-f', '%d_%t_%3s',  # Output filename: Date_Time_SeriesNumber
+    ]
+    
+    def convert_folder(folder_path, log):
+        """Run dcm2niix on a single folder, appending its report lines to log
+        Returns dcm2niix's exit code, or None if it could not be run to completion"""
         folder_name = folder_path.name
-        print(f"Processing folder: {folder_name}")
         
         # Create output directory: base_path_nii/folder_name
         nii_output_dir = nii_base_dir / folder_name
         nii_output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Change to folder directory and run dcm2niix
-        # Use -f to specify output filename pattern: %d_%t_%3s = Date_Time_SeriesNumber
-        # Use -z y to compress output
-        # Use -b y to save BIDS sidecar (includes .bval and .bvec for diffusion)
-        # Use -s y to save single file (don't split series)
-        # Use -m y to merge 2D slices from same series
-        # Use -ba y to anonymize BIDS sidecar
-        # Pattern format: %d = SeriesDate, %t = SeriesTime, %3s = SeriesNumber (3 digits)
-        cmd = [
-            dcm2niix_path,
-            '-z', 'y',      # Compress output (.nii.gz)
-            '-b', 'y',      # Save BIDS sidecar (.json)
-            '-s', 'y',      # Save single file (don't split series)
-            '-m', 'y',      # Merge 2D slices from same series
-            '-ba', 'n',     # Don't anonymize BIDS sidecar (keep all info)
-            '-f', '%d_%t_%3s',  # Output filename: Date_Time_SeriesNumber
+        # Run dcm2niix on the folder (input and output are passed as paths, so no chdir is needed)
+        parallel = active_workers > 1
+        cmd = base_cmd + [
+            '-z', 'i' if parallel else 'y',  # Compress output (.nii.gz)
             '-o', str(nii_output_dir),  # Output directory (_nii folder)
-            str(folder_path)  # Input directory
+            folder_path.path  # Input directory
         ]
         
         try:
-            result = subprocess.run(
-                cmd,
-                cwd=str(folder_path),
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout per folder
-            )
+            # Stream dcm2niix's output line by line instead of buffering all of it: only the key
+            # lines and a short tail (for the error report) are kept, whatever the series size
+            # stderr is merged into stdout so a single pipe is drained and neither one can fill up
+            # Started without a cwd: the paths in cmd are absolute, so the child needs no chdir
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            if cpus and parallel:
+                pin_to_worker_cpu(proc.pid)
+            timed_out = threading.Event()
+            
+            def kill_on_timeout():
+                timed_out.set()
+                proc.kill()
             
-            if result.returncode == 0:
-                print(f"  ✓ Successfully processed {folder_name}")
-                if result.stdout:
-                    # Print key information from dcm2niix output
-                    lines = result.stdout.split('\n')
-                    for line in lines:
-                        if 'Convert' in line or 'Saving' in line:
-                            print(f"    {line}")
+            timer = threading.Timer(DCM2NIIX_TIMEOUT, kill_on_timeout)
+            timer.start()
+            key_lines = []
+            tail = deque(maxlen=DCM2NIIX_ERROR_TAIL_LINES)
+            try:
+                with proc.stdout:
+                    for line in proc.stdout:
+                        # Output is kept as bytes: only the few lines that get printed are ever decoded
+                        if b'Convert' in line or b'Saving' in line:
+                            key_lines.append(line)
+                        tail.append(line)
+                returncode = proc.wait()
+            finally:
+                timer.cancel()
+            
+            if timed_out.is_set():
+                log.append(f"  ✗ Timeout processing {folder_name}")
+                return None
+            if returncode == 0:
+                log.append(f"  ✓ Successfully processed {folder_name}")
+                # Print key information from dcm2niix output
+                for line in key_lines:
+                    log.append(f"    {line.rstrip().decode('utf-8', 'replace')}")
             else:
-                print(f"  ✗ Error processing {folder_name}")
-                if result.stderr:
-                    print(f"    Error: {result.stderr[:200]}")
-            return (folder_name, result.returncode == 0)
-        except subprocess.TimeoutExpired:
-            print(f"  ✗ Timeout processing {folder_name}")
-            return (folder_name, False)
+                log.append(f"  ✗ Error processing {folder_name}")
+                if tail:
+                    error = b' '.join(line.strip() for line in tail)
+                    log.append(f"    Error: {error[:200].decode('utf-8', 'replace')}")
+            return returncode
         except FileNotFoundError:
-            print(f"  ✗ dcm2niix not found. Please install dcm2niix or specify correct path.")
-            return (folder_name, False)
+            log.append(f"  ✗ dcm2niix not found. Please install dcm2niix or specify correct path.")
+            return None
         except Exception as e:
-            print(f"  ✗ Error processing {folder_name}: {e}")
-            return (folder_name, False)
+            log.append(f"  ✗ Error processing {folder_name}: {e}")
+            return None
+    
+    # With skip_existing, skip-or-convert is decided as the scan finds each folder, so only the
+    # folders that need converting are scheduled (and timed by the throughput ramp)
+    skipped_results = []
+    dicom_mtimes = {}  # {folder name: newest DICOM mtime} already taken by the scan
+    
+    def folders_to_convert():
+        for folder_path in dicom_folders_found():
+            if not skip_existing:
+                yield folder_path
+                continue
+            _check_cancel(cancel_event)
+            folder_name = folder_path.name
+            nii_output_dir = nii_base_dir / folder_name
+            dicom_mtime = _newest_mtime(folder_path.path)
+            record = previous.get(folder_name)
+            # A folder where dcm2niix exited 0 but wrote nothing is converted again, not skipped for good
+            outputs = record.get('outputs') if isinstance(record, dict) else None
+            if (outputs and record.get('status') == 'ok' and record.get('dicom_mtime') == dicom_mtime
+                    and all(os.path.exists(nii_output_dir / name) for name in outputs)):
+                print(f"Skipping folder: {folder_name} (converted in a previous run)")
+                skipped_results.append((folder_name, True, True))
+                continue
+            if _nii_newer_than(nii_output_dir, dicom_mtime):
+                print(f"Skipping folder: {folder_name} (NIfTI output is up to date)")
+                records.put((folder_name, {'status': 'ok', 'exit_code': None, 'dicom_mtime': dicom_mtime,
+                                           'outputs': _output_names(nii_output_dir)}))
+                skipped_results.append((folder_name, True, True))
+                continue
+            dicom_mtimes[folder_name] = dicom_mtime
+            yield folder_path
+    
+    def process_folder(folder_path):
+        """Process a single folder with dcm2niix"""
+        _check_cancel(cancel_event)
+        folder_name = folder_path.name
+        nii_output_dir = nii_base_dir / folder_name
+        dicom_mtime = dicom_mtimes.pop(folder_name, None)
+        if dicom_mtime is None:
+            dicom_mtime = _newest_mtime(folder_path.path)
+        if skip_existing:
+            # Stale or partial output of this folder would otherwise sit next to the new files
+            _remove_output_files(nii_output_dir, NII_OUTPUT_SUFFIXES)
+        # Collect the folder's report and print it with one call: pool threads don't take the
+        # stdout lock once per line, and reports of parallel folders don't interleave
+        log = [f"Processing folder: {folder_name}"]
+        exit_code = convert_folder(folder_path, log)
+        print('\n'.join(log))
+        records.put((folder_name, {'status': 'ok' if exit_code == 0 else 'failed', 'exit_code': exit_code,
+                                   'dicom_mtime': dicom_mtime, 'outputs': _output_names(nii_output_dir)}))
+        return (folder_name, exit_code == 0, False)
+    
+    # Finished folders are queued to a writer thread that keeps the manifest on disk current,
+    # so an interrupted run still leaves a record of everything converted before it stopped
+    records = queue.Queue()
+    manifest = dict(previous)
+    
+    def write_records():
+        """Writer thread: fold finished folders into the manifest, one rewrite per batch"""
+        finished = False
+        while not finished:
+            batch = [records.get()]
+            while True:
+                try:
+                    batch.append(records.get_nowait())
+                except queue.Empty:
+                    break
+            changed = False
+            for item in batch:
+                if item is _PIPELINE_DONE:
+                    finished = True
+                else:
+                    manifest[item[0]] = item[1]
+                    changed = True
+            if changed:
+                try:
+                    _write_manifest(manifest_path, manifest)
+                except OSError as e:
+                    print(f"  Warning: could not write {manifest_path}: {e}")
+    
+    writer = threading.Thread(target=write_records, daemon=True)
+    writer.start()
     
     # Process folders
-    if use_parallel and len(folders) > 1:
-        print(f"Using parallel processing with {min(MAX_WORKERS, len(folders))} workers...\n")
-        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(folders))) as executor:
-            results = list(executor.map(process_folder, folders))
-    else:
-        results = [process_folder(folder) for folder in folders]
+    # Each conversion already runs in its own dcm2niix process; a worker thread only waits on it
+    # (the GIL is released while waiting), so threads are enough to run conversions concurrently
+    # Worker threads only add a thread hop when MAX_WORKERS == 1
+    folders = folders_to_convert()
+    workers = min(MAX_WORKERS, DCM2NIIX_MAX_WORKERS)
+    try:
+        if use_parallel and auto_workers and workers > 1:
+            # Disk bandwidth, not the CPU count, limits dcm2niix - only add workers while they pay off,
+            # and never past the DCM2NIIX_MAX_WORKERS cap
+            print(f"Using parallel processing, ramping up to {workers} workers by throughput...\n")
+            results = _map_ramping_workers(process_folder, folders, workers, on_workers=use_workers)
+        elif use_parallel and workers > 1:
+            print(f"Using parallel processing with {workers} workers...\n")
+            use_workers(workers)
+            # The scan keeps finding folders in a producer thread while the workers convert
+            results = list(_run_pipeline(process_folder, folders, workers))
+        else:
+            results = list(map(process_folder, folders))
+    finally:
+        # Also on cancel: the folders finished so far stay recorded
+        records.put(_PIPELINE_DONE)
+        writer.join()
+    results = skipped_results + results
+    
+    if not results:
+        print(f"No folders with DICOM files found in {base_path}")
+        return
     
     # Summary
-    successful = sum(1 for _, success in results if success)
+    successful = sum(1 for _, success, _ in results if success)
+    skipped = sum(1 for _, _, was_skipped in results if was_skipped)
     print(f"\n{'='*50}")
-    print(f"Summary: {successful}/{len(folders)} folders processed successfully")
+    print(f"Summary: {successful}/{len(results)} folders processed successfully")
+    if skipped:
+        print(f"         {skipped} of them skipped (NIfTI output already up to date)")
     print(f"{'='*50}")
 
 
 def merge_csv_files(csv_files, output_file, use_parallel=True):
-    """Merge multiple CSV files into one"""
+    """Merge multiple CSV files into one and return the number of series rows written"""
+    import pandas as pd
     print(f"  Merging {len(csv_files)} CSV files...")
     
-    essential_columns = ['SeriesNumber', 'FolderName', 'SeriesDescription',
-                        'MRAcquisitionType', 'X_Dim', 'Y_Dim', 'Z_Dim', 'X_Voxel', 'Y_Voxel', 'Z_Voxel',
-                        'SliceGap', 'InversionTime', 'EchoTime',
-                        'RepetitionTime', 'FlipAngle', 'Position', 'StudyDescription',
-                        'SeriesAcqTime',
-                        'DiffusionBValue', 'NumberOfVolumes', 'NumberOfB0s',
-                        'MultibandFactor', 'InplaneAccelFactor',
-                        'PhaseEncodingDirection', 'NumberOfAverages', 'Bandwidth',
-                        'CoilName', 'SliceOrientation',
-                        'MagneticFieldStrength', 'PercentPhaseFOV', 'PercentSampling']
-    
-    merged_df = pd.DataFrame()
+    # Collect the frames in input order and concatenate them once at the end
+    frames = [None] * len(csv_files)
     
     if use_parallel and len(csv_files) > 5:
         print(f"  Using parallel processing with {MAX_WORKERS} workers...")
         with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
             results = list(executor.map(_read_and_process_csv, csv_files))
         
-        for df, error in results:
+        for i, (df, error) in enumerate(results):
             if error:
                 print(f"  Warning: Error reading CSV file: {error}")
             elif df is not None:
-                merged_df = pd.concat([merged_df, df], ignore_index=True)
+                frames[i] = df
     else:
         # Sequential processing
-        for csv_file in csv_files:
-            try:
-                df = pd.read_csv(csv_file)
-                # Ensure all columns exist
-                for col in essential_columns:
-                    if col not in df.columns:
-                        if col in ['SeriesNumber', 'X_Fov', 'Y_Fov', 'Z_Fov', 'X_Dim', 'Y_Dim', 
-                                  'Z_Dim', 'X_Voxel', 'Y_Voxel', 'Z_Voxel', 'SliceGap', 
-                                  'InversionTime', 'EchoTime', 'RepetitionTime', 'FlipAngle',
-                                  'DiffusionBValue', 'NumberOfVolumes', 'NumberOfB0s', 'NumberOfDiffusionDirections',
-                                  'MultibandFactor', 'InplaneAccelFactor', 'NumberOfAverages', 'Bandwidth']:
-                            df[col] = None
-                        else:
-                            df[col] = ''
-                
-                df = df[essential_columns]
-                merged_df = pd.concat([merged_df, df], ignore_index=True)
-            except Exception as e:
-                print(f"  Warning: Error reading {csv_file}: {e}")
+        # Same reindex-based column fill as the parallel path, one file at a time
+        for i, csv_file in enumerate(csv_files):
+            df, error = _read_and_process_csv(csv_file)
+            if error:
+                print(f"  Warning: Error reading {csv_file}: {error}")
+            else:
+                frames[i] = df
     
-    # Sort by SeriesNumber
-    if 'SeriesNumber' in merged_df.columns:
-        merged_df = merged_df.sort_values('SeriesNumber')
+    frames = [df for df in frames if df is not None]
+    merged_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    n_series = _write_summary(merged_df, output_file)
     
+    # Delete individual CSV files after successful merge
+    print(f"  Deleting {len(csv_files)} individual CSV files...")
+    deleted_count = 0
+    output_name = os.path.basename(os.fspath(output_file))
+    for csv_file in map(os.fspath, csv_files):
+        # Don't delete the merged file itself
+        if os.path.basename(csv_file) == output_name:
+            continue
+        try:
+            os.unlink(csv_file)
+            deleted_count += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"  Warning: Could not delete {csv_file}: {e}")
+    print(f"  Deleted {deleted_count} individual CSV files.")
+    return n_series
+
+
+def write_summary_csv(rows, output_file):
+    """Write the summary CSV straight from process_dicom_folders rows and return the number of series rows"""
+    import pandas as pd
+    print(f"  Writing {len(rows)} series to the summary CSV...")
+    # Parse the rows as one CSV text so every column gets the same types as when
+    # the per-series CSV files were read back - no per-series files are needed
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(SERIES_CSV_COLUMNS)
+    writer.writerows(rows)
+    buffer.seek(0)
+    merged_df = pd.read_csv(buffer, usecols=_USECOLS).reindex(columns=ESSENTIAL_COLUMNS)
+    return _write_summary(merged_df, output_file)
+
+
+def _write_summary(merged_df, output_file):
+    """Deduplicate, sort and save the merged summary; returns the number of rows written"""
     # CRITICAL: Remove duplicate rows based on FolderName (same series should only appear once)
+    # Done before sorting so the discarded rows are never sorted
     if 'FolderName' in merged_df.columns:
         initial_count = len(merged_df)
         # Keep only the first occurrence of each FolderName
@@ -1404,23 +2120,13 @@ def merge_csv_files(csv_files, output_file, use_parallel=True):
         if len(merged_df) < initial_count:
             print(f"  Removed {initial_count - len(merged_df)} duplicate rows (same FolderName)")
     
+    # Sort by SeriesNumber (stable, so equal series numbers keep their input order)
+    if 'SeriesNumber' in merged_df.columns:
+        merged_df = merged_df.sort_values('SeriesNumber', kind='stable', ignore_index=True)
+    
     merged_df.to_csv(output_file, index=False)
     print(f"  Summary CSV saved to: {output_file} ({len(merged_df)} rows)")
-    
-    # Delete individual CSV files after successful merge
-    print(f"  Deleting {len(csv_files)} individual CSV files...")
-    deleted_count = 0
-    output_file_path = Path(output_file)
-    for csv_file in csv_files:
-        try:
-            csv_path = Path(csv_file)
-            # Don't delete the merged file itself
-            if csv_path.name != output_file_path.name:
-                csv_path.unlink()
-                deleted_count += 1
-        except Exception as e:
-            print(f"  Warning: Could not delete {csv_file}: {e}")
-    print(f"  Deleted {deleted_count} individual CSV files.")
+    return len(merged_df)
 
 
 def main():
@@ -1493,7 +2199,7 @@ Note:
         print("\nExample:")
         print('  python process_dicom.py "G:\\DIFFUSION_PG\\PETIT_GROU_2019-02-21\\Petit_Grou_20190221_143040754"')
         print("\nPlease provide the folder path:")
-        base_path = input("Folder path: ").strip().strip('"').strip("'")
+        base_path = _clean_path_input(input("Folder path: "))
         
         if not base_path:
             print("\nError: No folder path provided. Exiting.")
@@ -1538,9 +2244,6 @@ Note:
         print(f"  dcm2niix:      Enabled ({dcm2niix_path})")
     print()
     
-    # Create output directory
-    os.makedirs(output_path, exist_ok=True)
-    
     # Check if files are already organized
     print("Checking if files are already organized...")
     files_already_organized = check_if_files_organized(base_path)
@@ -1566,18 +2269,11 @@ Note:
         print("DICOM files organized.\n")
     
     # Step 3: Process folders and generate CSV
-    # Check if CSV files already exist
-    csv_files = list(Path(output_path).glob('*.csv')) if Path(output_path).exists() else []
-    merged_csv_path = os.path.join(output_path, merged_csv_filename)
-    
-    # Auto-overwrite: remove existing CSV directory
-    if os.path.exists(output_path):
-        import shutil
-        try:
-            shutil.rmtree(output_path)
-            print(f"  Removed existing CSV directory: {output_path}")
-        except:
-            pass
+    # Auto-overwrite: remove the CSV files a previous run left in the output directory,
+    # then create it (the only place main creates it - Steps 1-2 never write there)
+    removed = _remove_output_files(output_path, '.csv')
+    if removed:
+        print(f"  Removed {removed} existing CSV files from: {output_path}")
     os.makedirs(output_path, exist_ok=True)
     
     print("Step 3: Processing folders and generating CSV files...")
@@ -1586,12 +2282,12 @@ Note:
     
     # Step 4: Merge CSV files
     print("Step 4: Merging CSV files...")
-    csv_files = list(Path(output_path).glob('*.csv'))
+    csv_files = _list_csv_files(output_path)
     merged_csv_path = os.path.join(output_path, merged_csv_filename)
     if csv_files:
-        merge_csv_files([str(f) for f in csv_files], 
-                        merged_csv_path,
-                        use_parallel=use_parallel)
+        n_series = merge_csv_files(csv_files, 
+                                   merged_csv_path,
+                                   use_parallel=use_parallel)
         print("Merging completed.\n")
     else:
         print("No CSV files found to merge.\n")
@@ -1599,15 +2295,11 @@ Note:
     # Step 5: Run dcm2niix conversion (optional)
     if run_dcm2niix:
         nii_base_dir = str(base_path_obj.parent / f"{base_path_obj.name}_nii")
-        # Auto-overwrite: remove existing NIfTI directory
-        if os.path.exists(nii_base_dir):
-            import shutil
-            try:
-                shutil.rmtree(nii_base_dir)
-                print(f"  Removed existing NIfTI directory: {nii_base_dir}")
-            except:
-                pass
-        os.makedirs(nii_base_dir, exist_ok=True)
+        # Auto-overwrite: remove the dcm2niix outputs of a previous run (the series folders are reused)
+        removed = _remove_output_files(nii_base_dir, NII_OUTPUT_SUFFIXES, recursive=True)
+        if removed:
+            print(f"  Removed {removed} existing NIfTI output files from: {nii_base_dir}")
+        # run_dcm2niix_on_folders creates nii_base_dir itself
         
         print("Step 5: Running dcm2niix conversion...")
         run_dcm2niix_on_folders(base_path, dcm2niix_path=dcm2niix_path, use_parallel=use_parallel)
@@ -1621,7 +2313,16 @@ Note:
         print(f"  Individual CSVs: {output_path}")
         print(f"  Summary CSV:      {merged_csv_path}")
         print(f"\nTotal CSV files generated: {len(csv_files)}")
-        print(f"Summary CSV contains: {len(pd.read_csv(merged_csv_path))} series")
+        print(f"Summary CSV contains: {n_series} series")
+
+
+# GUI updates from the processing thread are queued and applied by the Tk thread once per tick
+UI_PUMP_MS = 100
+# While nothing is being processed the tick only has to catch the occasional message
+UI_IDLE_PUMP_MS = 250
+LOG_FLUSH_MAX_LINES = 2000
+# The log widget keeps only the most recent lines - Text layout slows down as it grows
+LOG_MAX_LINES = 5000
 
 
 class DICOMProcessorGUI:
@@ -1675,14 +2376,31 @@ class DICOMProcessorGUI:
         
         self.processing = False
         
+        # Log lines and UI calls from any thread are queued here (deque.append is atomic)
+        # and applied by the Tk thread in _pump_ui - worker threads never touch widgets
+        self._log_queue = deque()
+        self._ui_calls = deque()
+        self._last_pct = 0  # last percentage sent to the progress bar
+        # Set by the Cancel button; the pipeline checks it between files and stops cleanly
+        self._cancel = threading.Event()
+        
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(UI_PUMP_MS, self._pump_ui)
         
     def setup_ui(self):
         """Setup the user interface - Modern UI with CustomTkinter"""
-        if self.use_ctk:
-            self.setup_ui_ctk()
-        else:
-            self.setup_ui_tkinter()
+        # Build the widgets with the window hidden so Tk lays them out in one pass
+        # instead of re-laying out the visible window after every child is added
+        self.root.withdraw()
+        try:
+            if self.use_ctk:
+                self.setup_ui_ctk()
+            else:
+                self.setup_ui_tkinter()
+        finally:
+            self.root.update_idletasks()
+            self.root.deiconify()
     
     def setup_ui_ctk(self):
         """Setup CustomTkinter UI - Modern and beautiful"""
@@ -1797,13 +2515,12 @@ class DICOMProcessorGUI:
         status_container.grid(row=5, column=0, sticky="ew", padx=20, pady=(0, 15))
         status_container.grid_columnconfigure(0, weight=1)
         
-        # Progress bar - CustomTkinter doesn't have indeterminate mode, use animation
+        # Progress bar - determinate, driven by the processing steps (see _set_progress)
         self.progress = ctk.CTkProgressBar(status_container,
                                           height=20,
                                           corner_radius=10)
         self.progress.grid(row=0, column=0, sticky="ew", pady=(0, 10))
         self.progress.set(0)
-        self.progress_animating = False
         
         # Status label
         self.status_label = ctk.CTkLabel(status_container,
@@ -1842,49 +2559,54 @@ class DICOMProcessorGUI:
             'text_secondary': '#7f8c8d'
         }
         
+        # The palette is fixed once set, so read it into locals for the widget construction below
+        colors = self.colors
+        bg, text_secondary = colors['bg'], colors['text_secondary']
+        accent, accent_hover, border, success = colors['accent'], colors['accent_hover'], colors['border'], colors['success']
+        
+        # Shared widget defaults (option database) and ttk styles - set before any widget is created
+        self.configure_styles()
+        
         # Configure root background
-        self.root.configure(bg=self.colors['bg'])
+        self.root.configure(bg=bg)
         
         # Main container with padding
-        container = tk.Frame(self.root, bg=self.colors['bg'])
+        container = tk.Frame(self.root, bg=bg)
         container.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
         
         # Header section with title
-        header_frame = tk.Frame(container, bg=self.colors['bg'])
+        header_frame = tk.Frame(container, bg=bg)
         header_frame.pack(fill=tk.X, pady=(0, 25))
         
         title_label = tk.Label(header_frame, 
                                text="DICOM Info Gatherer",
                                font=("Segoe UI", 24, "bold"),
-                               bg=self.colors['bg'],
-                               fg=self.colors['fg'])
+                               bg=bg)
         title_label.pack(anchor=tk.W)
         
         subtitle_label = tk.Label(header_frame,
                                  text="Extract and organize DICOM file information",
                                  font=("Segoe UI", 10),
-                                 bg=self.colors['bg'],
-                                 fg=self.colors['text_secondary'])
+                                 bg=bg,
+                                 fg=text_secondary)
         subtitle_label.pack(anchor=tk.W, pady=(5, 0))
         
         # Card-style frame for main content
-        card_frame = tk.Frame(container, bg=self.colors['card_bg'], relief=tk.FLAT)
+        card_frame = tk.Frame(container, relief=tk.FLAT)
         card_frame.pack(fill=tk.BOTH, expand=True)
         
         # Inner padding
-        inner_frame = tk.Frame(card_frame, bg=self.colors['card_bg'])
+        inner_frame = tk.Frame(card_frame)
         inner_frame.pack(fill=tk.BOTH, expand=True, padx=25, pady=25)
         inner_frame.columnconfigure(1, weight=1)
         
         # Folder selection section
         folder_label = tk.Label(inner_frame, 
                                text="DICOM Folder",
-                               font=("Segoe UI", 11, "bold"),
-                               bg=self.colors['card_bg'],
-                               fg=self.colors['fg'])
+                               font=("Segoe UI", 11, "bold"))
         folder_label.grid(row=0, column=0, columnspan=3, sticky=tk.W, pady=(0, 8))
         
-        folder_container = tk.Frame(inner_frame, bg=self.colors['card_bg'])
+        folder_container = tk.Frame(inner_frame)
         folder_container.grid(row=1, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 20))
         folder_container.columnconfigure(0, weight=1)
         
@@ -1894,17 +2616,17 @@ class DICOMProcessorGUI:
                                      relief=tk.SOLID,
                                      borderwidth=1,
                                      highlightthickness=1,
-                                     highlightcolor=self.colors['accent'],
-                                     highlightbackground=self.colors['border'])
+                                     highlightcolor=accent,
+                                     highlightbackground=border)
         self.folder_entry.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=(0, 10))
         
         browse_btn = tk.Button(folder_container,
                               text="Browse",
                               command=self.browse_folder,
                               font=("Segoe UI", 10, "bold"),
-                              bg=self.colors['accent'],
+                              bg=accent,
                               fg='white',
-                              activebackground=self.colors['accent_hover'],
+                              activebackground=accent_hover,
                               activeforeground='white',
                               relief=tk.FLAT,
                               cursor='hand2',
@@ -1915,57 +2637,40 @@ class DICOMProcessorGUI:
         # Options section
         options_label = tk.Label(inner_frame,
                                 text="Processing Options",
-                                font=("Segoe UI", 11, "bold"),
-                                bg=self.colors['card_bg'],
-                                fg=self.colors['fg'])
+                                font=("Segoe UI", 11, "bold"))
         options_label.grid(row=2, column=0, columnspan=3, sticky=tk.W, pady=(0, 12))
         
-        options_container = tk.Frame(inner_frame, bg=self.colors['card_bg'])
+        options_container = tk.Frame(inner_frame)
         options_container.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 25))
         
         # Parallel processing checkbox
-        parallel_frame = tk.Frame(options_container, bg=self.colors['card_bg'])
+        parallel_frame = tk.Frame(options_container)
         parallel_frame.pack(fill=tk.X, pady=8)
         
         self.parallel_check = tk.Checkbutton(parallel_frame,
                                             text="Enable parallel processing",
                                             variable=self.use_parallel,
-                                            font=("Segoe UI", 10),
-                                            bg=self.colors['card_bg'],
-                                            fg=self.colors['fg'],
-                                            activebackground=self.colors['card_bg'],
-                                            activeforeground=self.colors['fg'],
-                                            selectcolor=self.colors['card_bg'],
                                             cursor='hand2')
         self.parallel_check.pack(side=tk.LEFT)
         
         # dcm2niix checkbox
-        dcm2niix_frame = tk.Frame(options_container, bg=self.colors['card_bg'])
+        dcm2niix_frame = tk.Frame(options_container)
         dcm2niix_frame.pack(fill=tk.X, pady=8)
         
         self.dcm2niix_check = tk.Checkbutton(dcm2niix_frame,
                                              text="Run dcm2niix conversion after processing",
                                              variable=self.run_dcm2niix,
-                                             font=("Segoe UI", 10),
-                                             bg=self.colors['card_bg'],
-                                             fg=self.colors['fg'],
-                                             activebackground=self.colors['card_bg'],
-                                             activeforeground=self.colors['fg'],
-                                             selectcolor=self.colors['card_bg'],
                                              cursor='hand2',
                                              command=self.toggle_dcm2niix_path)
         self.dcm2niix_check.pack(side=tk.LEFT)
         
         # dcm2niix path entry
-        dcm2niix_path_frame = tk.Frame(options_container, bg=self.colors['card_bg'])
+        dcm2niix_path_frame = tk.Frame(options_container)
         dcm2niix_path_frame.pack(fill=tk.X, pady=8)
         dcm2niix_path_frame.columnconfigure(1, weight=1)
         
         tk.Label(dcm2niix_path_frame,
-                text="dcm2niix path:",
-                font=("Segoe UI", 10),
-                bg=self.colors['card_bg'],
-                fg=self.colors['fg']).grid(row=0, column=0, sticky=tk.W, padx=(20, 10))
+                text="dcm2niix path:").grid(row=0, column=0, sticky=tk.W, padx=(20, 10))
         
         self.dcm2niix_entry = tk.Entry(dcm2niix_path_frame,
                                        textvariable=self.dcm2niix_path,
@@ -1973,20 +2678,20 @@ class DICOMProcessorGUI:
                                        relief=tk.SOLID,
                                        borderwidth=1,
                                        highlightthickness=1,
-                                       highlightcolor=self.colors['accent'],
-                                       highlightbackground=self.colors['border'],
+                                       highlightcolor=accent,
+                                       highlightbackground=border,
                                        state=tk.DISABLED)
         self.dcm2niix_entry.grid(row=0, column=1, sticky=(tk.W, tk.E))
         
         # Process button
-        button_container = tk.Frame(inner_frame, bg=self.colors['card_bg'])
+        button_container = tk.Frame(inner_frame)
         button_container.grid(row=4, column=0, columnspan=3, pady=20)
         
         self.process_button = tk.Button(button_container,
                                         text="▶ Start Processing",
                                         command=self.start_processing,
                                         font=("Segoe UI", 12, "bold"),
-                                        bg=self.colors['success'],
+                                        bg=success,
                                         fg='white',
                                         activebackground='#229954',
                                         activeforeground='white',
@@ -1997,34 +2702,31 @@ class DICOMProcessorGUI:
         self.process_button.pack()
         
         # Status section
-        status_container = tk.Frame(inner_frame, bg=self.colors['card_bg'])
+        status_container = tk.Frame(inner_frame)
         status_container.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 15))
         status_container.columnconfigure(0, weight=1)
         
-        # Progress bar
+        # Progress bar - determinate, driven by the processing steps (see _set_progress)
         self.progress = ttk.Progressbar(status_container,
-                                        mode='indeterminate',
+                                        mode='determinate',
+                                        maximum=100,
                                         length=400,
                                         style="Modern.Horizontal.TProgressbar")
         self.progress.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
         
-        # Status label
-        self.status_label = tk.Label(status_container,
-                                    text="Ready to process",
-                                    font=("Segoe UI", 10),
-                                    bg=self.colors['card_bg'],
-                                    fg=self.colors['success'])
+        # Status label - its color comes from the Working/Success/Error.TLabel styles (see configure_styles)
+        self.status_label = ttk.Label(status_container,
+                                     text="Ready to process",
+                                     style="Success.TLabel")
         self.status_label.grid(row=1, column=0, sticky=tk.W)
         
         # Output log section
         log_label = tk.Label(inner_frame,
                             text="Output Log",
-                            font=("Segoe UI", 11, "bold"),
-                            bg=self.colors['card_bg'],
-                            fg=self.colors['fg'])
+                            font=("Segoe UI", 11, "bold"))
         log_label.grid(row=6, column=0, columnspan=3, sticky=tk.W, pady=(0, 8))
         
-        log_container = tk.Frame(inner_frame, bg=self.colors['card_bg'])
+        log_container = tk.Frame(inner_frame)
         log_container.grid(row=7, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 0))
         log_container.columnconfigure(0, weight=1)
         log_container.rowconfigure(0, weight=1)
@@ -2044,9 +2746,6 @@ class DICOMProcessorGUI:
                                                   pady=12)
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        # Configure modern style
-        self.configure_styles()
-        
     def toggle_dcm2niix_path(self):
         """Enable/disable dcm2niix path entry based on checkbox"""
         if self.run_dcm2niix.get():
@@ -2060,34 +2759,44 @@ class DICOMProcessorGUI:
             else:
                 self.dcm2niix_entry.config(state=tk.DISABLED)
     
-    def start_progress_animation(self):
-        """Start progress bar animation for CustomTkinter"""
+    def _set_progress(self, pct):
+        """Show pct (0-100) on the progress bar - Tk thread only"""
         if self.use_ctk:
-            self.progress_animating = True
-            self._animate_progress()
-    
-    def _animate_progress(self):
-        """Animate progress bar"""
-        if not self.progress_animating:
-            return
-        current = self.progress.get()
-        if current >= 1.0:
-            self.progress.set(0)
+            self.progress.set(pct / 100)
         else:
-            self.progress.set(current + 0.02)
-        self.root.after(50, self._animate_progress)
+            self.progress['value'] = pct
     
-    def stop_progress_animation(self):
-        """Stop progress bar animation"""
-        if self.use_ctk:
-            self.progress_animating = False
-            self.progress.set(0)
-        else:
-            self.progress.stop()
+    def _report_progress(self, pct):
+        """Report progress from the processing thread; the bar is only repainted when pct changes"""
+        if pct != self._last_pct:
+            self._last_pct = pct
+            self._call_in_ui(self._set_progress, pct)
+    
+    def _progress_band(self, start, end):
+        """Return a progress(done, total) callback for a step covering start..end percent of the bar"""
+        def progress(done, total):
+            self._report_progress(start + (end - start) * done // max(1, total))
+        return progress
     
     def configure_styles(self):
-        """Configure modern ttk styles (for tkinter fallback)"""
+        """Configure modern ttk styles and the shared widget defaults (for tkinter fallback)"""
         if not self.use_ctk:
+            # Most widgets sit on the card, so its colors and the body font are the defaults;
+            # widgets that differ (header, buttons, entries, log) still pass their own options
+            card_bg, fg = self.colors['card_bg'], self.colors['fg']
+            body_font = '{Segoe UI} 10'
+            for pattern, value in (('*Frame.background', card_bg),
+                                   ('*Label.background', card_bg),
+                                   ('*Label.foreground', fg),
+                                   ('*Label.font', body_font),
+                                   ('*Checkbutton.background', card_bg),
+                                   ('*Checkbutton.foreground', fg),
+                                   ('*Checkbutton.activeBackground', card_bg),
+                                   ('*Checkbutton.activeForeground', fg),
+                                   ('*Checkbutton.selectColor', card_bg),
+                                   ('*Checkbutton.font', body_font)):
+                self.root.option_add(pattern, value)
+            
             style = ttk.Style()
             style.theme_use('clam')
             
@@ -2098,6 +2807,13 @@ class DICOMProcessorGUI:
                            borderwidth=0,
                            lightcolor=self.colors['accent'],
                            darkcolor=self.colors['accent'])
+            
+            # Status label styles - switching state is a style change instead of re-parsing colors
+            for name, color in (("Working.TLabel", self.colors['accent']),
+                                ("Warning.TLabel", self.colors['warning']),
+                                ("Success.TLabel", self.colors['success']),
+                                ("Error.TLabel", self.colors['error'])):
+                style.configure(name, background=card_bg, foreground=color, font=body_font)
         
     def browse_folder(self):
         """Browse for folder"""
@@ -2106,22 +2822,47 @@ class DICOMProcessorGUI:
             self.folder_path.set(folder)
             
     def log(self, message):
-        """Add message to log with modern styling"""
-        if self.use_ctk:
-            self.log_text.insert("end", message + "\n")
-            self.log_text.see("end")
-        else:
-            self.log_text.insert(tk.END, message + "\n")
-            self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        """Queue a message for the log - safe to call from the processing thread"""
+        self._log_queue.append(message)
+    
+    def _drain_log(self):
+        """Write the queued log messages to the log widget with a single insert"""
+        pending = self._log_queue
+        if not pending:
+            return
+        lines = [pending.popleft() for _ in range(min(len(pending), LOG_FLUSH_MAX_LINES))]
+        end = "end" if self.use_ctk else tk.END
+        # Only follow the tail if the user hasn't scrolled up to read earlier output
+        at_bottom = self.log_text.yview()[1] > 0.999
+        self.log_text.insert(end, "\n".join(lines) + "\n")
+        # Drop the oldest lines in one delete once the log grows past LOG_MAX_LINES
+        excess = int(self.log_text.index("end-1c").split(".")[0]) - LOG_MAX_LINES
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+        if at_bottom:
+            self.log_text.see(end)
+    
+    def _call_in_ui(self, func, *args):
+        """Queue func(*args) to run on the Tk thread - safe to call from the processing thread"""
+        self._ui_calls.append((func, args))
+    
+    def _pump_ui(self):
+        """Periodic Tk-thread tick: write queued log lines, then run queued UI calls"""
+        # Reschedule first so a failing call or a modal dialog doesn't stop the pump
+        self.root.after(UI_PUMP_MS if self.processing else UI_IDLE_PUMP_MS, self._pump_ui)
+        self._drain_log()
+        calls = self._ui_calls
+        while calls:
+            func, args = calls.popleft()
+            func(*args)
         
     def start_processing(self):
-        """Start processing in a separate thread"""
+        """Start processing in a separate thread - while running, the same button cancels it"""
         if self.processing:
-            messagebox.showwarning("Warning", "Processing is already in progress!")
+            self.cancel_processing()
             return
             
-        folder = self.folder_path.get().strip().strip('"').strip("'")
+        folder = _clean_path_input(self.folder_path.get())
         if not folder:
             messagebox.showerror("Error", "Please select a DICOM folder!")
             return
@@ -2130,24 +2871,20 @@ class DICOMProcessorGUI:
             messagebox.showerror("Error", f"Folder does not exist:\n{folder}")
             return
         
-        # Check for existing files BEFORE starting the thread
-        base_path_obj = Path(folder)
-        output_path = str(base_path_obj.parent / f"{base_path_obj.name}_CSV")
-        merged_csv_filename = f"{base_path_obj.name}_merged.csv"
-        nii_base_dir = str(base_path_obj.parent / f"{base_path_obj.name}_nii")
+        # Check for existing files BEFORE starting the thread; the worker reuses the same plan
+        plan = _plan_paths(folder)
         
         overwrite_csv = True
         overwrite_nii = True
         
         # Check CSV files
-        csv_files = list(Path(output_path).glob('*.csv')) if Path(output_path).exists() else []
-        merged_csv_path = Path(output_path) / merged_csv_filename
-        if csv_files or merged_csv_path.exists():
+        csv_count = _count_csv_files(plan.output_path)
+        if csv_count or os.path.exists(plan.merged_csv_path):
             response = messagebox.askyesno(
                 "CSV Files Exist",
-                f"CSV files already exist in:\n{output_path}\n\n"
-                f"Found {len(csv_files)} CSV file(s).\n"
-                f"Summary CSV: {merged_csv_path.name}\n\n"
+                f"CSV files already exist in:\n{plan.output_path}\n\n"
+                f"Found {csv_count} CSV file(s).\n"
+                f"Summary CSV: {os.path.basename(plan.merged_csv_path)}\n\n"
                 "Do you want to overwrite them?",
                 icon='question'
             )
@@ -2155,55 +2892,80 @@ class DICOMProcessorGUI:
         
         # Check NIfTI files if dcm2niix is enabled
         if self.run_dcm2niix.get():
-            nii_files = list(Path(nii_base_dir).rglob('*.nii*')) if Path(nii_base_dir).exists() else []
-            if nii_files:
+            if _has_nii_files(plan.nii_dir):
                 response = messagebox.askyesno(
                     "NIfTI Files Exist",
-                    f"NIfTI files already exist in:\n{nii_base_dir}\n\n"
-                    f"Found {len(nii_files)} NIfTI file(s).\n\n"
+                    f"NIfTI files already exist in:\n{plan.nii_dir}\n\n"
                     "Do you want to overwrite them?",
                     icon='question'
                 )
                 overwrite_nii = response
             
         self.processing = True
+        self._cancel.clear()
+        self._last_pct = 0
+        self._set_progress(0)
         if self.use_ctk:
-            self.process_button.configure(state="disabled", text="⏳ Processing...", fg_color="gray")
-            self.start_progress_animation()
+            self.process_button.configure(text="■ Cancel", fg_color=("#e74c3c", "#c0392b"))
             self.status_label.configure(text="Processing...", text_color="blue")
             self.log_text.delete("1.0", "end")
         else:
-            self.process_button.config(state='disabled', text="⏳ Processing...", bg=self.colors['text_secondary'])
-            self.progress.start()
-            self.status_label.config(text="Processing...", fg=self.colors['accent'])
+            self.process_button.config(text="■ Cancel", bg=self.colors['error'])
+            self.status_label.configure(text="Processing...", style="Working.TLabel")
             self.log_text.delete(1.0, tk.END)
         
         # Run processing in separate thread with overwrite flags
-        thread = threading.Thread(target=self.process_dicom_files, args=(folder, overwrite_csv, overwrite_nii), daemon=True)
+        thread = threading.Thread(target=self.process_dicom_files, args=(plan, overwrite_csv, overwrite_nii), daemon=True)
         thread.start()
+    
+    def cancel_processing(self):
+        """Ask the processing thread to stop after the file it is working on"""
+        self._cancel.set()
+        self.log("\nCancelling - waiting for the current file to finish...")
+        if self.use_ctk:
+            self.process_button.configure(state="disabled", text="Cancelling...", fg_color="gray")
+            self.status_label.configure(text="Cancelling...", text_color="orange")
+        else:
+            self.process_button.config(state='disabled', text="Cancelling...", bg=self.colors['text_secondary'])
+            self.status_label.configure(text="Cancelling...", style="Warning.TLabel")
+    
+    def on_close(self):
+        """Close the window - a running job is cancelled first so no output file is cut off mid-write"""
+        if self.processing:
+            if not self._cancel.is_set():
+                self.cancel_processing()
+            # Check again on the next tick; processing_complete clears self.processing
+            self.root.after(UI_PUMP_MS, self.on_close)
+            return
+        self.root.destroy()
         
-    def process_dicom_files(self, base_path, overwrite_csv=True, overwrite_nii=True):
-        """Process DICOM files (runs in separate thread)"""
+    def process_dicom_files(self, plan, overwrite_csv=True, overwrite_nii=True):
+        """Process DICOM files for a RunPlan (runs in separate thread)"""
         try:
             # Redirect stdout to GUI log
-            import sys
-            from io import StringIO
-            
             class LogRedirect:
+                """Line splitter: complete lines go to log_func, only the unfinished tail is kept"""
+                __slots__ = ('log_func', '_tail', '_lock')
+                
                 def __init__(self, log_func):
                     self.log_func = log_func
-                    self.buffer = StringIO()
+                    self._tail = ''
+                    # dcm2niix runs in a background thread while the summary is written
+                    self._lock = threading.Lock()
                     
                 def write(self, text):
-                    if text.strip():
-                        self.log_func(text.rstrip())
-                    self.buffer.write(text)
+                    with self._lock:
+                        self._tail += text
+                        if '\n' in self._tail:
+                            *lines, self._tail = self._tail.split('\n')
+                            for line in lines:
+                                self.log_func(line)
                     
                 def flush(self):
-                    pass
-                    
-                def getvalue(self):
-                    return self.buffer.getvalue()
+                    with self._lock:
+                        if self._tail:
+                            self.log_func(self._tail)
+                            self._tail = ''
             
             log_redirect = LogRedirect(self.log)
             old_stdout = sys.stdout
@@ -2211,9 +2973,9 @@ class DICOMProcessorGUI:
             
             try:
                 # Process
-                base_path_obj = Path(base_path)
-                output_path = str(base_path_obj.parent / f"{base_path_obj.name}_CSV")
-                merged_csv_filename = f"{base_path_obj.name}_merged.csv"
+                base_path = plan.base_path
+                output_path = plan.output_path
+                merged_csv_path = plan.merged_csv_path
                 use_parallel = self.use_parallel.get()
                 run_dcm2niix = self.run_dcm2niix.get()
                 dcm2niix_path = self.dcm2niix_path.get()
@@ -2224,7 +2986,7 @@ class DICOMProcessorGUI:
                 print(f"\nConfiguration:")
                 print(f"  Base path:      {base_path}")
                 print(f"  Output path:    {output_path}")
-                print(f"  Summary CSV:     {merged_csv_filename}")
+                print(f"  Summary CSV:     {os.path.basename(merged_csv_path)}")
                 print(f"  Parallel mode:  {'Enabled' if use_parallel else 'Disabled'}")
                 if use_parallel:
                     print(f"  Workers:        {MAX_WORKERS}")
@@ -2246,85 +3008,106 @@ class DICOMProcessorGUI:
                 if not files_already_organized:
                     # Step 1: Find DICOM files
                     print("\nStep 1: Finding DICOM files...")
-                    dicom_files = find_dicom_files(base_path, use_parallel=use_parallel)
+                    dicom_files = find_dicom_files(base_path, use_parallel=use_parallel,
+                                                   cancel_event=self._cancel)
                     print(f"Found {len(dicom_files)} DICOM files.\n")
+                    self._report_progress(10)
                     
                     if not dicom_files:
                         print("No DICOM files found!")
+                        log_redirect.flush()
                         sys.stdout = old_stdout
-                        self.root.after(0, self.processing_complete, False, "No DICOM files found!")
+                        self._call_in_ui(self.processing_complete, False, "No DICOM files found!")
                         return
                     
                     # Step 2: Organize files
                     print("Step 2: Organizing DICOM files into folders...")
-                    organize_dicom_files(dicom_files, base_path, use_parallel=use_parallel)
+                    organize_dicom_files(dicom_files, base_path, use_parallel=use_parallel,
+                                         progress=self._progress_band(10, 40),
+                                         cancel_event=self._cancel)
                     print("DICOM files organized.\n")
                 
                 # Step 3: Process folders and generate CSV
                 # overwrite_csv is already determined in main thread
+                series_rows = None
                 if not overwrite_csv:
                     self.log("\nSkipping CSV generation. Existing files will not be overwritten.")
                 else:
                     print("Step 3: Processing folders and generating CSV files...")
-                    process_dicom_folders(base_path, output_path, use_parallel=use_parallel)
-                    print("CSV files generated.\n")
-                    
-                    # Step 4: Merge CSV files
-                    print("Step 4: Merging CSV files...")
-                    csv_files = list(Path(output_path).glob('*.csv'))
-                    merged_csv_path = os.path.join(output_path, merged_csv_filename)
-                    if csv_files:
-                        merge_csv_files([str(f) for f in csv_files], 
-                                        merged_csv_path,
-                                        use_parallel=use_parallel)
-                        print("Merging completed.\n")
-                    else:
-                        print("No CSV files found to merge.\n")
+                    series_rows = process_dicom_folders(base_path, output_path, use_parallel=use_parallel,
+                                                        save_per_series=False,
+                                                        progress=self._progress_band(40, 85),
+                                                        cancel_event=self._cancel)
+                    print("Series information collected.\n")
                 
-                # Step 5: Run dcm2niix conversion (optional)
-                if run_dcm2niix:
-                    nii_base_dir = str(base_path_obj.parent / f"{base_path_obj.name}_nii")
-                    # overwrite_nii is already determined in main thread
-                    if not overwrite_nii:
-                        self.log("\nSkipping dcm2niix conversion. Existing files will not be overwritten.")
-                    else:
-                        print("Step 5: Running dcm2niix conversion...")
-                        run_dcm2niix_on_folders(base_path, dcm2niix_path=dcm2niix_path, use_parallel=use_parallel)
+                # Steps 4 and 5 are independent - the summary only needs the rows from Step 3 and
+                # dcm2niix only reads the organized DICOM folders - so dcm2niix runs in the background
+                with ThreadPoolExecutor(max_workers=1) as background:
+                    nii_future = None
+                    
+                    # Step 5: Run dcm2niix conversion (optional)
+                    if run_dcm2niix:
+                        # overwrite_nii is already determined in main thread
+                        if not overwrite_nii:
+                            self.log("\nSkipping dcm2niix conversion. Existing files will not be overwritten.")
+                        else:
+                            print("Step 5: Running dcm2niix conversion (alongside Step 4)...")
+                            nii_future = background.submit(run_dcm2niix_on_folders, base_path,
+                                                           dcm2niix_path=dcm2niix_path, use_parallel=use_parallel,
+                                                           dicom_folders=_series_folder_names(series_rows or []),
+                                                           cancel_event=self._cancel, auto_workers=True)
+                    
+                    # Step 4: Write the summary CSV from the collected rows
+                    if series_rows is not None:
+                        print("Step 4: Writing summary CSV...")
+                        if series_rows:
+                            n_series = write_summary_csv(series_rows, merged_csv_path)
+                            print("Summary completed.\n")
+                        else:
+                            print("No series found to summarize.\n")
+                    self._report_progress(90)
+                    
+                    if nii_future is not None:
+                        nii_future.result()
                         print("dcm2niix conversion completed.\n")
+                self._report_progress(100)
                 
                 print("=" * 70)
                 print("DICOM processing completed successfully!")
                 print("=" * 70)
-                if csv_files:
+                if series_rows:
                     print(f"\nOutput files:")
-                    print(f"  Individual CSVs: {output_path}")
                     print(f"  Summary CSV:      {merged_csv_path}")
-                    print(f"\nTotal CSV files generated: {len(csv_files)}")
-                    try:
-                        print(f"Summary CSV contains: {len(pd.read_csv(merged_csv_path))} series")
-                    except:
-                        pass
+                    print(f"\nTotal series processed: {len(series_rows)}")
+                    print(f"Summary CSV contains: {n_series} series")
                 
+                log_redirect.flush()
                 sys.stdout = old_stdout
-                self.root.after(0, self.processing_complete, True, merged_csv_path if csv_files else None)
+                self._call_in_ui(self.processing_complete, True, merged_csv_path if series_rows else None)
                 
             finally:
+                log_redirect.flush()
                 sys.stdout = old_stdout
             
+        except ProcessingCancelled:
+            self.log("\nProcessing cancelled.")
+            self._call_in_ui(self.processing_complete, False, None, True)
         except Exception as e:
-            import traceback
             error_msg = f"\nERROR: {str(e)}\n{traceback.format_exc()}"
             self.log(error_msg)
-            self.root.after(0, self.processing_complete, False, str(e))
+            self._call_in_ui(self.processing_complete, False, str(e))
             
-    def processing_complete(self, success, result):
+    def processing_complete(self, success, result, cancelled=False):
         """Called when processing is complete"""
         self.processing = False
+        # Show the last log lines before any result dialog opens
+        self._drain_log()
         if self.use_ctk:
             self.process_button.configure(state="normal", text="▶ Start Processing", fg_color=("#2ecc71", "#27ae60"))
-            self.stop_progress_animation()
             
-            if success:
+            if cancelled:
+                self.status_label.configure(text="Processing cancelled", text_color="orange")
+            elif success:
                 self.status_label.configure(text="✓ Processing completed successfully!", text_color="green")
                 if result:
                     messagebox.showinfo("Success", 
@@ -2334,20 +3117,22 @@ class DICOMProcessorGUI:
                 messagebox.showerror("Error", f"Processing failed:\n{result}")
         else:
             self.process_button.config(state='normal', text="▶ Start Processing", bg=self.colors['success'])
-            self.progress.stop()
             
-            if success:
-                self.status_label.config(text="✓ Processing completed successfully!", fg=self.colors['success'])
+            if cancelled:
+                self.status_label.configure(text="Processing cancelled", style="Warning.TLabel")
+            elif success:
+                self.status_label.configure(text="✓ Processing completed successfully!", style="Success.TLabel")
                 if result:
                     messagebox.showinfo("Success", 
                                       f"Processing completed!\n\nSummary CSV saved to:\n{result}")
             else:
-                self.status_label.config(text=f"✗ Error: {result}", fg=self.colors['error'])
+                self.status_label.configure(text=f"✗ Error: {result}", style="Error.TLabel")
                 messagebox.showerror("Error", f"Processing failed:\n{result}")
 
 
 def main():
     """Main processing function"""
+    global MAX_WORKERS
     # Parse command line arguments
     parser = argparse.ArgumentParser(
         description='DICOM Info Gatherer - Extract and organize DICOM file information',
@@ -2363,14 +3148,23 @@ Examples:
   # Disable parallel processing
   python process_dicom.py "path/to/folder" --no-parallel
   
+  # Use 4 parallel workers (e.g. one shard per node of a batch array job)
+  python process_dicom.py "path/to/folder" --workers 4
+  
   # Enable dcm2niix conversion
   python process_dicom.py "path/to/folder" --dcm2niix
   
+  # Resume an interrupted dcm2niix conversion
+  python process_dicom.py "path/to/folder" --dcm2niix --skip-existing
+  
+  # Pin each parallel dcm2niix conversion to its own CPU (Linux, node not shared with other runs)
+  python process_dicom.py "path/to/folder" --dcm2niix --pin-cpus
+  
   # Launch GUI mode
   python process_dicom.py --gui
 
 Output:
-  - Individual CSV files: <output_path>/<SeriesNumber>_<SeriesDescription>.csv
+  - Individual CSV files (with --save-per-series): <output_path>/<SeriesNumber>_<SeriesDescription>.csv
   - Summary CSV file: <output_path>/<folder_name>_summary.csv
   - Output path: <base_path>_CSV
   - NIfTI output (if --dcm2niix): <base_path>_nii
@@ -2402,6 +3196,14 @@ Note:
         help='Disable parallel processing (use sequential processing instead)'
     )
     
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        metavar='N',
+        help=f'Number of parallel workers (default: {MAX_WORKERS}, one less than the available CPUs)'
+    )
+    
     parser.add_argument(
         '--dcm2niix',
         action='store_true',
@@ -2415,11 +3217,35 @@ Note:
         help='Path to dcm2niix executable (default: "dcm2niix")'
     )
     
+    parser.add_argument(
+        '--save-per-series',
+        action='store_true',
+        help='Also keep one CSV file per series next to the summary CSV'
+    )
+    
+    parser.add_argument(
+        '--skip-existing',
+        action='store_true',
+        help='With --dcm2niix, keep NIfTI output that is newer than its DICOM files and only '
+             'convert the other folders (resumes an interrupted conversion)'
+    )
+    
+    parser.add_argument(
+        '--pin-cpus',
+        action='store_true',
+        help='With --dcm2niix, pin each parallel conversion to one CPU (Linux only; '
+             'don\'t use when other runs share the node)'
+    )
+    
     args = parser.parse_args()
+    if args.workers < 0:
+        parser.error("--workers must be a positive number")
+    if args.workers:
+        MAX_WORKERS = args.workers
     
     # Launch GUI if requested
     if args.gui:
-        if not GUI_AVAILABLE:
+        if not _init_gui():
             print("ERROR: GUI is not available. tkinter is not installed.")
             print("On Linux, install it using: sudo apt-get install python3-tk")
             sys.exit(1)
@@ -2441,7 +3267,7 @@ Note:
         print('  python process_dicom.py "G:\\DIFFUSION_PG\\PETIT_GROU_2019-02-21\\Petit_Grou_20190221_143040754"')
         print("\nUse --help for more options")
         print("\nPlease provide the folder path:")
-        base_path = input("Folder path: ").strip().strip('"').strip("'")
+        base_path = _clean_path_input(input("Folder path: "))
         
         if not base_path:
             print("\nError: No folder path provided. Exiting.")
@@ -2458,8 +3284,8 @@ Note:
         print(f"\nError: Path is not a directory: {base_path}")
         sys.exit(1)
     
-    # Auto-generate output_path: base_path + "_CSV"
-    output_path = str(base_path_obj.parent / f"{base_path_obj.name}_CSV")
+    # Auto-generate the output folders: base_path + "_CSV" and base_path + "_nii"
+    output_path, nii_base_dir = _output_dirs(base_path_obj)
     
     # Auto-generate merged CSV filename: base_path folder name + "_summary.csv"
     merged_csv_filename = f"{base_path_obj.name}_summary.csv"
@@ -2470,6 +3296,11 @@ Note:
     # Run dcm2niix conversion
     run_dcm2niix = args.dcm2niix
     dcm2niix_path = args.dcm2niix_path
+    skip_existing = args.skip_existing
+    pin_cpus = args.pin_cpus
+    
+    # The summary is built from memory; per-series CSV files are only written on request
+    save_per_series = args.save_per_series
     
     # Display configuration
     print("=" * 70)
@@ -2484,11 +3315,10 @@ Note:
         print(f"  Workers:        {MAX_WORKERS}")
     if run_dcm2niix:
         print(f"  dcm2niix:      Enabled ({dcm2niix_path})")
+        if skip_existing:
+            print(f"  Up-to-date NIfTI output is kept")
     print()
     
-    # Create output directory
-    os.makedirs(output_path, exist_ok=True)
-    
     # Check if files are already organized
     print("Checking if files are already organized...")
     files_already_organized = check_if_files_organized(base_path)
@@ -2514,67 +3344,76 @@ Note:
         print("DICOM files organized.\n")
     
     # Step 3: Process folders and generate CSV
-    # Check if CSV files already exist
-    csv_files = list(Path(output_path).glob('*.csv')) if Path(output_path).exists() else []
-    merged_csv_path = os.path.join(output_path, merged_csv_filename)
-    
-    # Auto-overwrite: remove existing CSV directory
-    if os.path.exists(output_path):
-        import shutil
-        try:
-            shutil.rmtree(output_path)
-            print(f"  Removed existing CSV directory: {output_path}")
-        except:
-            pass
+    # Auto-overwrite: the summary (and any per-series CSV) is written with mode 'w', so existing
+    # files are overwritten in place - only make sure the directory exists (the only place main
+    # creates it - Steps 1-2 never write there)
     os.makedirs(output_path, exist_ok=True)
     
     print("Step 3: Processing folders and generating CSV files...")
-    process_dicom_folders(base_path, output_path, use_parallel=use_parallel)
-    print("CSV files generated.\n")
-    
-    # Step 4: Merge CSV files
-    print("Step 4: Merging CSV files...")
-    csv_files = list(Path(output_path).glob('*.csv'))
-    merged_csv_path = os.path.join(output_path, merged_csv_filename)
-    if csv_files:
-        merge_csv_files([str(f) for f in csv_files], 
-                        merged_csv_path,
-                        use_parallel=use_parallel)
-        print("Merging completed.\n")
-    else:
-        print("No CSV files found to merge.\n")
-    
-    # Step 5: Run dcm2niix conversion (optional)
-    if run_dcm2niix:
-        nii_base_dir = str(base_path_obj.parent / f"{base_path_obj.name}_nii")
-        # Auto-overwrite: remove existing NIfTI directory
-        if os.path.exists(nii_base_dir):
-            import shutil
-            try:
-                shutil.rmtree(nii_base_dir)
-                print(f"  Removed existing NIfTI directory: {nii_base_dir}")
-            except:
-                pass
-        os.makedirs(nii_base_dir, exist_ok=True)
+    series_rows = process_dicom_folders(base_path, output_path, use_parallel=use_parallel,
+                                        save_per_series=save_per_series)
+    print("Series information collected.\n")
+    
+    # Steps 4 and 5 are independent - the summary only needs the rows from Step 3 and dcm2niix
+    # only reads the organized DICOM folders - so dcm2niix runs in the background meanwhile
+    with ThreadPoolExecutor(max_workers=1) as background:
+        nii_future = None
+        
+        # Step 5: Run dcm2niix conversion (optional)
+        if run_dcm2niix:
+            # Auto-overwrite: remove the dcm2niix outputs of a previous run (the series folders are reused)
+            # unless up-to-date outputs are to be kept
+            if not skip_existing:
+                removed = _remove_output_files(nii_base_dir, NII_OUTPUT_SUFFIXES, recursive=True)
+                if removed:
+                    print(f"  Removed {removed} existing NIfTI output files from: {nii_base_dir}")
+            # run_dcm2niix_on_folders creates nii_base_dir itself
+            
+            print("Step 5: Running dcm2niix conversion (alongside Step 4)...")
+            # Folders that produced a summary row are known to hold DICOM files, so they are not probed again
+            nii_future = background.submit(run_dcm2niix_on_folders, base_path, dcm2niix_path=dcm2niix_path,
+                                           use_parallel=use_parallel,
+                                           dicom_folders=_series_folder_names(series_rows),
+                                           auto_workers=True, skip_existing=skip_existing,
+                                           pin_cpus=pin_cpus)
+        
+        # Step 4: Write the summary CSV from the collected rows
+        print("Step 4: Writing summary CSV...")
+        merged_csv_path = os.path.join(output_path, merged_csv_filename)
+        if series_rows:
+            n_series = write_summary_csv(series_rows, merged_csv_path)
+            print("Summary completed.\n")
+        else:
+            print("No series found to summarize.\n")
         
-        print("Step 5: Running dcm2niix conversion...")
-        run_dcm2niix_on_folders(base_path, dcm2niix_path=dcm2niix_path, use_parallel=use_parallel)
-        print("dcm2niix conversion completed.\n")
+        if nii_future is not None:
+            nii_future.result()
+            print("dcm2niix conversion completed.\n")
     
     print("=" * 70)
     print("DICOM processing completed successfully!")
     print("=" * 70)
-    if csv_files:
+    if series_rows:
         print(f"\nOutput files:")
-        print(f"  Individual CSVs: {output_path}")
+        if save_per_series:
+            print(f"  Individual CSVs: {output_path}")
         print(f"  Summary CSV:      {merged_csv_path}")
-        print(f"\nTotal CSV files generated: {len(csv_files)}")
-        print(f"Summary CSV contains: {len(pd.read_csv(merged_csv_path))} series")
+        print(f"\nTotal series processed: {len(series_rows)}")
+        print(f"Summary CSV contains: {n_series} series")
 
 
 if __name__ == '__main__':
     if len(sys.argv) > 1 and '--gui' in sys.argv:
-        if not GUI_AVAILABLE:
+        # main() isn't called for the GUI, so --workers is picked up here
+        gui_parser = argparse.ArgumentParser(add_help=False)
+        gui_parser.add_argument('--workers', type=int, default=0)
+        gui_args, _ = gui_parser.parse_known_args()
+        if gui_args.workers < 0:
+            gui_parser.error("--workers must be a positive number")
+        if gui_args.workers:
+            MAX_WORKERS = gui_args.workers
+        
+        if not _init_gui():
             print("ERROR: GUI is not available. tkinter is not installed.")
             print("Please install it or use command-line mode.")
             sys.exit(1)
@@ -2587,7 +3426,6 @@ if __name__ == '__main__':
                 app = DICOMProcessorGUI()
                 app.root.mainloop()
             except (Exception, SystemError, OSError) as e:
-                import traceback
                 print(f"Error initializing CustomTkinter GUI: {e}")
                 traceback.print_exc()
                 print("Falling back to standard tkinter...")
@@ -0,0 +1,79 @@
+"""Cancelling a parallel run must stop it promptly instead of draining the whole pool"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import process_dicom
+
+
+def _slow_batch(file_paths):
+    """Stand-in for _check_dicom_batch that takes a while per batch"""
+    time.sleep(0.05)
+    return [False] * len(file_paths)
+
+
+class CancelTest(unittest.TestCase):
+
+    def setUp(self):
+        self._saved = (process_dicom.MAX_WORKERS, process_dicom._check_dicom_batch)
+        process_dicom.MAX_WORKERS = 2
+
+    def tearDown(self):
+        process_dicom.MAX_WORKERS, process_dicom._check_dicom_batch = self._saved
+
+    def test_find_dicom_files_cancel_mid_run(self):
+        process_dicom._check_dicom_batch = _slow_batch
+        cancel_event = threading.Event()
+        with tempfile.TemporaryDirectory() as directory:
+            for i in range(400):
+                open(os.path.join(directory, f"file{i:03d}"), 'wb').close()
+            # 400 files in batches of 25 on 2 workers: about 0.4 s if run to the end
+            threading.Timer(0.1, cancel_event.set).start()
+            start = time.monotonic()
+            with self.assertRaises(process_dicom.ProcessingCancelled):
+                process_dicom.find_dicom_files(directory, use_parallel=True, cancel_event=cancel_event)
+            self.assertLess(time.monotonic() - start, 0.25)
+
+    def test_map_cancellable_drops_queued_tasks(self):
+        cancel_event = threading.Event()
+        started = []
+
+        def task(item):
+            started.append(item)
+            time.sleep(0.02)
+            return item
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = process_dicom._map_cancellable(executor, task, range(100), cancel_event)
+            with self.assertRaises(process_dicom.ProcessingCancelled):
+                for _, item in results:
+                    if item == 5:
+                        cancel_event.set()
+        # Only the window after item 5 may have been submitted, never the whole range
+        self.assertLess(len(started), 15)
+
+    def test_map_cancellable_returns_every_index(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = dict(process_dicom._map_cancellable(executor, abs, range(-20, 0), None))
+        self.assertEqual(results, {index: 20 - index for index in range(20)})
+
+    def test_map_cancellable_slow_item_does_not_block_the_rest(self):
+        def task(item):
+            time.sleep(0.3 if item == 0 else 0.01)
+            return item
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            order = [index for index, _ in process_dicom._map_cancellable(executor, task, range(10), None)]
+        # The other worker keeps going through items 1-9 while item 0 is still running
+        self.assertEqual(order[-1], 0)
+        self.assertEqual(sorted(order), list(range(10)))
+
+
+if __name__ == '__main__':
+    unittest.main()